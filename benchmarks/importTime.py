@@ -0,0 +1,74 @@
+"""
+Benchmark of the time taken by ``import textvisualizer``.
+
+Each measure runs in a fresh interpreter, so nothing is cached between runs.
+The heavy plotting and NLP backends must be loaded only when a function needs them.
+
+Run it from the root of the repository::
+
+    python -m benchmarks.importTime --budget 0.5
+
+It exits with status 1 if the best import time is over the budget or if a heavy
+backend was loaded by the import.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ['matplotlib', 'plotly', 'sklearn', 'yellowbrick', 'networkx', 'wordcloud',
+                 'matplotlib_venn_wordcloud', 'wordtree', 'pandas', 'scipy']
+
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import textvisualizer
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds': seconds, 'loaded': [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measureImport(repeat=5):
+    """
+    Measure the import time of the package in fresh interpreters.
+
+    Parameters
+    ----------
+    repeat : int
+        Number of interpreters to run.
+
+    Returns
+    -------
+    dict with the best time in seconds, the time of every run and the heavy modules loaded.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = []
+    loaded = set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _SCRIPT], cwd=root, check=True,
+                                capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        runs.append(result['seconds'])
+        loaded.update(result['loaded'])
+    return {'seconds': min(runs), 'runs': runs, 'loaded': sorted(loaded)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget', type=float, default=0.5,
+                        help='maximum import time in seconds')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of fresh interpreters to time')
+    args = parser.parse_args(argv)
+
+    result = measureImport(args.repeat)
+    result['budget'] = args.budget
+    result['ok'] = result['seconds'] <= args.budget and not result['loaded']
+    print(json.dumps(result, indent=2))
+    return 0 if result['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Benchmark of the stages of every visualization on a synthetic corpus.
+
+Each visualization is timed stage by stage: tokenize, count, top-k, layout and render,
+with the module functions, with the methods of Corpus and with the methods of a Corpus
+built with internTokens=True. For Corpus, the count stage is timed on a fresh corpus and
+the cached stage on a second call, which reuses the caches of the corpus. The layout cache
+is disabled while the benchmark runs.
+
+Run it from the root of the repository::
+
+    python -m benchmarks.stageTimes --documents 10000 --length 200 --output stages.json
+
+The result is a JSON document with the corpus parameters and the best time of every stage,
+so it can be compared between releases.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from .syntheticCorpus import syntheticCorpus
+
+
+def timeStage(function, repeat=3):
+    """
+    Run a function several times and keep the best time.
+
+    Parameters
+    ----------
+    function : callable without arguments
+
+    repeat : int
+        Number of runs.
+
+    Returns
+    -------
+    tuple (dict, object)
+        The best time in seconds with the time of every run, and the result of the last run.
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        runs.append(time.perf_counter() - start)
+    return {'seconds': min(runs), 'runs': runs}, result
+
+
+def _render(figure):
+    """
+    Rasterize a matplotlib figure. Other figures are only built, since their
+    export needs external tools (kaleido, the graphviz binaries).
+    """
+    from textvisualizer.textvisualizer import figureBytes
+
+    if hasattr(figure, 'savefig'):
+        return figureBytes(figure, 'png')
+    return figure
+
+
+def _moduleStages(texts, labels, words):
+    """
+    Stages of the module functions: for each function, the list of (stage, callable of the
+    results of the previous stages).
+    """
+    import textvisualizer as tv
+    from textvisualizer.frequency.frequency import topFrequencies, _drawFrequencyPlotYellowbrick
+
+    group = sorted(set(labels))[:2]
+    return {
+        'tokenize': [
+            ('tokenize', lambda r: [tv.tokenize(text) for text in texts]),
+        ],
+        'frequencyPlot': [
+            ('count', lambda r: tv.documentTermMatrix(texts)),
+            ('topk', lambda r: topFrequencies(r['count'][0].sum(axis=0), r['count'][1], 20)),
+            ('render', lambda r: _render(tv.drawFrequencyPlot(r['topk']))),
+        ],
+        'frequencyPlotly': [
+            ('count', lambda r: tv.frequencyTable(texts, 20)),
+            ('render', lambda r: _render(tv.drawFrequencyPlotly(r['count']))),
+        ],
+        'frequencyPlotYellowbrick': [
+            ('count', lambda r: tv.documentTermMatrix(texts)),
+            ('render', lambda r: _render(_drawFrequencyPlotYellowbrick(*r['count'], 20))),
+        ],
+        'frequencyTreeMap': [
+            ('count', lambda r: tv.frequencyTable(texts, 100)),
+            ('render', lambda r: _render(tv.drawFrequencyTreeMap(r['count']))),
+        ],
+        'frequencyDonutChart': [
+            ('count', lambda r: tv.frequencyTable(texts, 20)),
+            ('render', lambda r: _render(tv.drawFrequencyDonutChart(r['count']))),
+        ],
+        'bubbleChart': [
+            ('count', lambda r: tv.frequencyTable(texts, 50)),
+            ('layout', lambda r: tv.bubbleLayout(r['count']['count'])),
+            ('render', lambda r: _render(tv.drawBubbleChart(r['count'], layout=r['layout']))),
+        ],
+        'bigramGraph': [
+            ('count', lambda r: tv.bigramCounts(texts, total_bigrams=15)),
+            ('render', lambda r: _render(tv.drawBigramGraph(r['count']))),
+        ],
+        'phraseNet': [
+            ('count', lambda r: tv.phraseNetGraph(texts, ['of', 'and'], 20)),
+            ('render', lambda r: _render(tv.drawPhraseNet(r['count']))),
+        ],
+        'phraseNetPlotly': [
+            ('count', lambda r: tv.phraseNetGraph(texts, ['of', 'and'], 20)),
+            ('render', lambda r: _render(tv.drawPhraseNetPlotly(r['count']))),
+        ],
+        'wordcloudPlot': [
+            ('count', lambda r: tv.frequencyTable(texts, 100)),
+            ('layout', lambda r: tv.wordcloudImages([dict(zip(r['count']['words'], r['count']['count']))])),
+        ],
+        'lexicalDispersionPlot': [
+            ('count', lambda r: tv.dispersionOffsets(texts, words)),
+            ('render', lambda r: _render(tv.drawLexicalDispersion(*r['count'], bins=100))),
+        ],
+        'wordCorrelationsPlot': [
+            ('count', lambda r: tv.wordCorrelations(texts, words)),
+            ('render', lambda r: _render(tv.drawWordCorrelations(r['count']))),
+        ],
+        'wordTree': [
+            ('count', lambda r: tv.wordTreeNgrams(texts, 'of', 5)),
+            ('render', lambda r: _render(tv.drawWordTree('of', r['count']))),
+        ],
+        'vennWordcloudPlot': [
+            ('count', lambda r: tv.vennMembership(texts, labels, group)),
+        ],
+    }
+
+
+def _corpusStages(texts, labels, words, internTokens=False):
+    """
+    Stages of the methods of Corpus. The first stage builds a new corpus and fills its caches.
+    """
+    import textvisualizer as tv
+
+    group = sorted(set(labels))[:2]
+
+    def fresh(method):
+        def step(r):
+            # the corpus of the last run, with filled caches, is used by the next stages
+            r['corpus'] = tv.Corpus(texts, labels, internTokens=internTokens)
+            return method(r['corpus'])
+        return step
+
+    def cached(method):
+        return lambda r: method(r['corpus'])
+
+    def chart(compute, draw):
+        return [
+            ('count', fresh(compute)),
+            ('cached', cached(compute)),
+            ('render', lambda r: _render(draw(r['cached']))),
+        ]
+
+    return {
+        'frequencyPlot': chart(lambda corpus: corpus.frequencyTable(20), tv.drawFrequencyPlot),
+        'frequencyTreeMap': chart(lambda corpus: corpus.frequencyTable(100), tv.drawFrequencyTreeMap),
+        'frequencyDonutChart': chart(lambda corpus: corpus.frequencyTable(20), tv.drawFrequencyDonutChart),
+        'bubbleChart': [
+            ('count', fresh(lambda corpus: corpus.frequencyTable(20))),
+            ('cached', cached(lambda corpus: corpus.frequencyTable(20))),
+            ('layout', lambda r: tv.bubbleLayout(r['cached']['count'])),
+            ('render', lambda r: _render(tv.drawBubbleChart(r['cached'], layout=r['layout']))),
+        ],
+        # the counts of the word clouds are internal to the methods, so they are timed with the layout
+        'wordcloudPlot': [
+            ('count+layout', fresh(lambda corpus: corpus.wordcloudPlot())),
+            ('cached+layout', cached(lambda corpus: corpus.wordcloudPlot())),
+            ('render', lambda r: _render(r['cached+layout'])),
+        ],
+        'wordcloudsByLabel': [
+            ('count+layout', fresh(lambda corpus: corpus.wordcloudsByLabel(labels=group))),
+            ('cached+layout', cached(lambda corpus: corpus.wordcloudsByLabel(labels=group))),
+        ],
+        'frequencyByLabel': [
+            ('count', fresh(lambda corpus: corpus.frequencyByLabel(20))),
+            ('cached', cached(lambda corpus: corpus.frequencyByLabel(20))),
+        ],
+        'bigramGraph': chart(lambda corpus: corpus.bigramCounts(total_bigrams=15), tv.drawBigramGraph),
+        'phraseNet': chart(lambda corpus: corpus.phraseNetGraph(['of', 'and'], 20), tv.drawPhraseNet),
+        'lexicalDispersionPlot': chart(lambda corpus: corpus.dispersionOffsets(words),
+                                       lambda offsets: tv.drawLexicalDispersion(*offsets, bins=100)),
+        'wordCorrelationsPlot': chart(lambda corpus: corpus.wordCorrelations(words), tv.drawWordCorrelations),
+        'wordTree': chart(lambda corpus: corpus.wordTreeNgrams('of', 5),
+                          lambda ngrams: tv.drawWordTree('of', ngrams)),
+        'vennWordcloudPlot': [
+            ('count', fresh(lambda corpus: corpus.vennMembership(group))),
+            ('cached', cached(lambda corpus: corpus.vennMembership(group))),
+        ],
+    }
+
+
+def runBenchmarks(texts, labels, functions=None, repeat=3):
+    """
+    Time the stages of the visualizations on a corpus.
+
+    Parameters
+    ----------
+    texts : list of str
+
+    labels : list of str
+
+    functions : list of str, default=None
+        Names of the visualizations to be timed. If None, all are timed.
+
+    repeat : int
+        Number of runs of each stage. The best time is kept.
+
+    Returns
+    -------
+    list of dict with the api ('module', 'Corpus' or 'Corpus(internTokens)'), the function, the stage and the times.
+    """
+    import textvisualizer as tv
+    from textvisualizer.frequency.frequency import frequencyTable
+
+    # targets of the dispersion and correlation charts: frequent words of the corpus
+    words = list(frequencyTable(texts[:1000], 12)['words'])
+
+    cache = tv.layoutCache
+    maxsize, directory, maxbytes = cache.maxsize, cache.directory, cache.maxbytes
+    tv.configureLayoutCache(maxsize=0)
+    results = []
+    try:
+        for api, stages in (('module', _moduleStages(texts, labels, words)),
+                            ('Corpus', _corpusStages(texts, labels, words)),
+                            ('Corpus(internTokens)', _corpusStages(texts, labels, words, internTokens=True))):
+            for function, steps in stages.items():
+                if functions is not None and function not in functions:
+                    continue
+                previous = {}
+                for stage, step in steps:
+                    timing, previous[stage] = timeStage(lambda: step(previous), repeat)
+                    results.append(dict(api=api, function=function, stage=stage, **timing))
+    finally:
+        tv.configureLayoutCache(maxsize=maxsize, directory=directory, maxbytes=maxbytes)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--documents', type=int, default=2000, help='number of texts')
+    parser.add_argument('--length', type=int, default=100, help='mean number of words of a text')
+    parser.add_argument('--vocabulary', type=int, default=5000, help='number of distinct words')
+    parser.add_argument('--labels', type=int, default=5, help='number of distinct labels')
+    parser.add_argument('--zipf', type=float, default=1.1, help='exponent of the Zipf distribution')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the corpus')
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs of each stage')
+    parser.add_argument('--functions', nargs='*', default=None, help='visualizations to be timed')
+    parser.add_argument('--output', default=None, help='JSON file of the results, stdout if not given')
+    args = parser.parse_args(argv)
+
+    import textvisualizer
+
+    parameters = dict(n_documents=args.documents, document_length=args.length,
+                      vocabulary_size=args.vocabulary, n_labels=args.labels,
+                      zipf_exponent=args.zipf, seed=args.seed)
+    texts, labels = syntheticCorpus(**parameters)
+    report = {
+        'version': textvisualizer.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus': parameters,
+        'repeat': args.repeat,
+        'results': runBenchmarks(texts, labels, args.functions, args.repeat),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
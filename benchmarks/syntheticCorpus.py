@@ -0,0 +1,88 @@
+"""
+Deterministic synthetic corpus for the benchmarks.
+
+The words follow a Zipf distribution, like the words of natural language, so the
+vocabulary has a few very frequent words and a long tail of rare ones. The most
+frequent words are common English connectors, so the phrase net and word tree
+benchmarks find phrases.
+
+    from benchmarks.syntheticCorpus import syntheticCorpus
+    texts, labels = syntheticCorpus(n_documents=10000, document_length=200)
+"""
+
+import numpy as np
+
+CONNECTORS = ['the', 'of', 'and', 'to', 'in', 'is', 'for', 'that', 'on', 'with']
+
+_LETTERS = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+
+
+def syntheticVocabulary(vocabulary_size):
+    """
+    Build a vocabulary of distinct words, the connectors first.
+
+    Parameters
+    ----------
+    vocabulary_size : int
+        Number of words.
+
+    Returns
+    -------
+    numpy array of str, sorted by rank.
+    """
+    words = CONNECTORS[:vocabulary_size]
+    # the other words spell their rank in base 26, after a prefix that keeps them
+    # at least two letters long and distinct from the connectors, none of which starts with x
+    for rank in range(len(words), vocabulary_size):
+        letters = []
+        while True:
+            rank, digit = divmod(rank, 26)
+            letters.append(_LETTERS[digit])
+            if rank == 0:
+                break
+        words.append('x' + ''.join(reversed(letters)))
+    return np.array(words, dtype=object)
+
+
+def syntheticCorpus(n_documents=1000, document_length=100, vocabulary_size=5000, n_labels=5,
+                    zipf_exponent=1.1, seed=0):
+    """
+    Generate a deterministic corpus of texts and labels.
+
+    Parameters
+    ----------
+    n_documents : int
+        Number of texts.
+
+    document_length : int
+        Mean number of words of a text. The lengths follow a Poisson distribution.
+
+    vocabulary_size : int
+        Number of distinct words.
+
+    n_labels : int
+        Number of distinct labels, drawn uniformly.
+
+    zipf_exponent : float
+        Exponent s of the Zipf distribution: the word of rank k has a probability
+        proportional to 1 / k ** s.
+
+    seed : int
+        Seed of the random generator. The same arguments always give the same corpus.
+
+    Returns
+    -------
+    tuple (list of str, list of str)
+        The texts and their labels.
+    """
+    rng = np.random.default_rng(seed)
+    words = syntheticVocabulary(vocabulary_size)
+    probabilities = 1.0 / np.arange(1, vocabulary_size + 1) ** zipf_exponent
+    probabilities /= probabilities.sum()
+
+    lengths = np.maximum(rng.poisson(document_length, n_documents), 1)
+    tokens = words[rng.choice(vocabulary_size, size=int(lengths.sum()), p=probabilities)]
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    texts = [' '.join(tokens[start:end]) + '.' for start, end in zip(bounds[:-1], bounds[1:])]
+    labels = ['label%d' % label for label in rng.integers(0, n_labels, n_documents)]
+    return texts, labels
@@ -0,0 +1,182 @@
+"""
+Compare the counting engines with their serial runs and with plain Python references.
+"""
+
+import copy
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import textvisualizer as tv
+from textvisualizer.counting.counting import tokenize
+from textvisualizer.phraseNet.phraseNet import PhraseIndex, _phraseCounts
+
+WORDS = ['the', 'of', 'and', 'cat', 'cats', 'dog', 'house', 'garden', 'tree', 'bird', 'new', 'york', 'is', 'a', '2020']
+
+
+def _texts(n=300, seed=0):
+    random = np.random.RandomState(seed)
+    weights = 1 / np.arange(1, len(WORDS) + 1)
+    texts = []
+    for i in range(n):
+        words = random.choice(WORDS, size=random.randint(0, 25), p=weights / weights.sum())
+        text = ' '.join(words)
+        # punctuation and case are removed by the tokenizer
+        texts.append(text.capitalize() + ('.' if i % 3 else ', The Cat!'))
+    texts[5] = ''
+    return texts
+
+
+TEXTS = _texts()
+LABELS = ['a', 'b', 'c', 'b'] * (len(TEXTS) // 4)
+
+
+@pytest.fixture(autouse=True)
+def uncachedStatistics():
+    # every test computes its own results, unless it turns a cache on itself
+    directory, maxbytes = tv.statisticsCache.directory, tv.statisticsCache.maxbytes
+    tv.configureStatisticsCache(None)
+    yield
+    tv.configureStatisticsCache(directory, maxbytes)
+
+
+def _sameMatrix(first, second):
+    (a, a_terms), (b, b_terms) = first, second
+    return list(a_terms) == list(b_terms) and a.shape == b.shape and (a != b).nnz == 0
+
+
+def _naiveBigrams(texts, stopwords=None):
+    stopwords = set(stopwords or [])
+    counts = Counter()
+    for text in texts:
+        tokens = [token for token in tokenize(text) if token not in stopwords]
+        counts.update(zip(tokens[:-1], tokens[1:]))
+    return counts
+
+
+def _naivePhrases(texts, connectors):
+    counts = Counter()
+    for text in texts:
+        tokens = tokenize(text)
+        for connector in connectors:
+            sequence = tokenize(connector)
+            for i in range(1, len(tokens) - len(sequence)):
+                if tokens[i:i + len(sequence)] == sequence:
+                    counts[(tokens[i - 1], ' '.join(sequence), tokens[i + len(sequence)])] += 1
+    return counts
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'stopwords': 'english'}, {'ngramRange': (1, 2)},
+                                    {'vocabulary': ['cat', 'dog', 'york']}])
+def test_documentTermMatrix_parallel_matches_serial(kwargs):
+    assert _sameMatrix(tv.documentTermMatrix(TEXTS, **kwargs), tv.documentTermMatrix(TEXTS, n_jobs=2, **kwargs))
+
+
+def test_countTerms_parallel_matches_serial_and_matrix():
+    bag_of_words, terms = tv.documentTermMatrix(TEXTS, stopwords=['the'], ngramRange=(1, 2))
+    expected = np.asarray(bag_of_words.sum(axis=0)).ravel()
+    for n_jobs in (None, 2):
+        counts, counted_terms = tv.countTerms(iter(TEXTS), stopwords=['the'], ngramRange=(1, 2),
+                                              batch_size=37, n_jobs=n_jobs)
+        assert list(counted_terms) == list(terms)
+        assert np.array_equal(counts, expected)
+
+
+def test_countTerms_raises_on_empty_vocabulary_like_matrix():
+    with pytest.raises(ValueError):
+        tv.documentTermMatrix(['the of', ''], stopwords='english')
+    for n_jobs in (None, 2):
+        with pytest.raises(ValueError):
+            tv.countTerms(['the of', ''], stopwords='english', batch_size=1, n_jobs=n_jobs)
+
+
+def test_tokenStore_parallel_matches_serial():
+    serial, parallel = tv.TokenStore(TEXTS), tv.TokenStore(TEXTS, n_jobs=2)
+    assert serial.ids.dtype == parallel.ids.dtype == np.uint32
+    assert list(serial.terms) == list(parallel.terms)
+    assert np.array_equal(serial.ids, parallel.ids)
+    assert np.array_equal(serial.offsets, parallel.offsets)
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'stopwords': 'english'}, {'ngramRange': (1, 3), 'stopwords': ['the']},
+                                    {'ngramRange': (2, 2), 'vocabulary': ['new york', 'the cat', 'cat']}])
+def test_tokenStore_matrix_matches_documentTermMatrix(kwargs):
+    assert _sameMatrix(tv.TokenStore(TEXTS).documentTermMatrix(**kwargs), tv.documentTermMatrix(TEXTS, **kwargs))
+
+
+@pytest.mark.parametrize('stopwords', [None, ['the', 'of']])
+def test_bigramCounts_match_reference(stopwords):
+    expected = sorted(_naiveBigrams(TEXTS, stopwords).items(), key=lambda x: (-x[1], x[0]))[:15]
+    tables = [tv.bigramCounts(TEXTS, stopwords, 15), tv.bigramCounts(TEXTS, stopwords, 15, n_jobs=2),
+              tv.Corpus(TEXTS, internTokens=True).bigramCounts(stopwords, total_bigrams=15)]
+    for table in tables:
+        assert list(zip(table['bigram'], table['count'])) == expected
+
+
+def test_phraseCounts_match_reference():
+    connectors = ['of', 'and', 'of the']
+    expected = _naivePhrases(TEXTS, connectors)
+    assert _phraseCounts(TEXTS, connectors) == expected
+    assert _phraseCounts(TEXTS, connectors, n_jobs=2) == expected
+    assert PhraseIndex(TEXTS).phraseCounts(connectors) == expected
+    assert PhraseIndex(TEXTS, n_jobs=2).phraseCounts(connectors) == expected
+
+
+def test_phraseNetGraph_parallel_matches_serial():
+    serial = tv.phraseNetGraph(TEXTS, ['of', 'and'], 10)
+    for G in (tv.phraseNetGraph(TEXTS, ['of', 'and'], 10, n_jobs=2),
+              tv.Corpus(TEXTS).phraseNetGraph(['of', 'and'], 10, n_jobs=2)):
+        assert list(G.nodes()) == list(serial.nodes())
+        assert list(G.edges()) == list(serial.edges())
+
+
+def test_phraseIndex_queries_match_module():
+    index = PhraseIndex(TEXTS)
+    offsets, total = tv.dispersionOffsets(TEXTS, ['cat', 'York', 'missing'])
+    index_offsets, index_total = index.offsets(['cat', 'York', 'missing'])
+    assert index_total == total
+    for word in offsets:
+        assert np.array_equal(index_offsets[word], offsets[word])
+    for keyword in ('cat', 'of', 'missing'):
+        assert index.keywordNgrams(keyword, 4) == tv.wordTreeNgrams(TEXTS, keyword, 4)
+
+
+def test_interned_corpus_matches_texts():
+    corpus, interned = tv.Corpus(TEXTS, LABELS), tv.Corpus(TEXTS, LABELS, internTokens=True, n_jobs=2)
+    assert interned.listText is None
+    assert interned.frequencyTable(10).equals(corpus.frequencyTable(10))
+    assert interned.frequencyTable(10, ngramRange=(1, 2), labels='a').equals(
+        corpus.frequencyTable(10, ngramRange=(1, 2), labels='a'))
+    assert interned.frequencyByLabel(5).equals(corpus.frequencyByLabel(5))
+    assert interned.bigramCounts(labels=['a', 'c']).equals(corpus.bigramCounts(labels=['a', 'c']))
+    assert interned.wordCorrelations(['cat', 'new york', 'dog']).equals(
+        corpus.wordCorrelations(['cat', 'new york', 'dog']))
+    assert interned.wordTreeNgrams('cat', 4) == corpus.wordTreeNgrams('cat', 4)
+    offsets, total = corpus.dispersionOffsets(['cat', 'dog'], labels='b')
+    interned_offsets, interned_total = interned.dispersionOffsets(['cat', 'dog'], labels='b')
+    assert interned_total == total
+    assert all(np.array_equal(interned_offsets[word], offsets[word]) for word in offsets)
+    assert list(interned.phraseNetGraph(['of']).edges()) == list(corpus.phraseNetGraph(['of']).edges())
+
+
+def test_statistics_cache_hit_matches_miss(tmp_path):
+    expected = tv.Corpus(TEXTS).frequencyTable(10)
+    tv.configureStatisticsCache(str(tmp_path))
+    for attempt in range(2):
+        # a new corpus reads the results stored by the first one
+        assert tv.Corpus(TEXTS).frequencyTable(10).equals(expected)
+        assert tv.frequencyTable(TEXTS, 10).equals(expected)
+        assert tv.bigramCounts(TEXTS).equals(tv.Corpus(TEXTS).bigramCounts())
+    assert len(list(tmp_path.iterdir())) > 0
+
+
+def test_result_cache_follows_changes():
+    corpus = tv.Corpus(list(TEXTS))
+    first = corpus.frequencyTable(10)
+    assert corpus.frequencyTable(10).equals(first)
+    copied = copy.copy(corpus)
+    corpus.listText.append('zebra ' * 10000)
+    assert corpus.frequencyTable(1)['words'].tolist() == ['zebra']
+    assert copied.frequencyTable(10).equals(first)
+    assert tv.Corpus(TEXTS).frequencyTable(10).equals(first)
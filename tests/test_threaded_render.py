@@ -0,0 +1,68 @@
+"""
+Render charts from several threads at once and compare them with serial renders.
+"""
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import textvisualizer as tv
+from textvisualizer.wordcloud.wordcloud import _drawWordcloud, _wordcloudFromFrequencies
+
+TEXTS = [
+    "the cat sat on the mat and the dog sat on the rug",
+    "a dog of the house and a cat of the garden",
+    "the bird sang in the tree and the cat looked at the bird",
+    "dogs and cats are friends of the children in the house",
+    "the garden of the house is green and the tree is tall",
+] * 4
+
+
+@pytest.fixture(autouse=True)
+def uncachedLayouts():
+    # every render computes its own layout, so the layouts are also computed concurrently
+    cache = tv.layoutCache
+    maxsize, directory, maxbytes = cache.maxsize, cache.directory, cache.maxbytes
+    tv.configureLayoutCache(maxsize=0)
+    yield
+    tv.configureLayoutCache(maxsize=maxsize, directory=directory, maxbytes=maxbytes)
+
+
+def _charts():
+    # the layout of a word cloud is random, so the same cloud is drawn by every thread
+    cloud = _wordcloudFromFrequencies({'cat': 5, 'dog': 4, 'house': 3, 'garden': 2, 'tree': 1})
+    return [
+        ('bubbleChart', lambda: tv.bubbleChart(TEXTS, 10)),
+        ('phraseNet', lambda: tv.phraseNet(TEXTS, ['of', 'and'])),
+        ('bigramGraph', lambda: tv.bigramGraph(TEXTS, total_bigrams=8)),
+        ('wordcloudPlot', lambda: _drawWordcloud(cloud)),
+        ('frequencyPlot', lambda: tv.frequencyPlot(TEXTS, 10)),
+        ('lexicalDispersionPlot', lambda: tv.lexicalDispersionPlot(TEXTS, ['cat', 'dog', 'tree'])),
+        ('wordCorrelationsPlot', lambda: tv.wordCorrelationsPlot(TEXTS, ['cat', 'dog', 'house'])),
+    ]
+
+
+def _pixels(figure):
+    figure.canvas.draw()
+    return np.array(figure.canvas.buffer_rgba())
+
+
+def test_threaded_render_matches_serial():
+    charts = _charts()
+    # the first render of the process loads the fonts and the styles of the backends
+    # (yellowbrick changes the matplotlib style when it is imported), which can change its output
+    for name, draw in charts:
+        _pixels(draw())
+    serial = {name: _pixels(draw()) for name, draw in charts}
+
+    tasks = charts * 8
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda chart: _pixels(chart[1]()), tasks))
+
+    for (name, draw), pixels in zip(tasks, results):
+        assert np.array_equal(pixels, serial[name]), name
@@ -7,9 +7,12 @@ from .phraseNet.phraseNet import *
 from .frequency.frequency import *
 from .wordcloud.wordcloud import *
 from .wordtree.wordtree import *
-from .bubbleChart.bubbleChart import bubbleChart
-from .lexicalDispersion.lexicalDispersion import lexicalDispersionPlot
-from .correlation.correlation import wordCorrelationsPlot
-from .bigramGraph.bigramGraph import bigramGraph
+from .bubbleChart.bubbleChart import bubbleChart, bubbleLayout, drawBubbleChart
+from .cache.cache import LRUCache, layoutCache, configureLayoutCache, statisticsCache, configureStatisticsCache
+from .cache.cache import ResultCache, resultCache, configureResultCache
+from .lexicalDispersion.lexicalDispersion import lexicalDispersionPlot, dispersionOffsets, drawLexicalDispersion
+from .correlation.correlation import wordCorrelationsPlot, wordCorrelations, drawWordCorrelations, drawWordCorrelationsPlotly
+from .bigramGraph.bigramGraph import bigramGraph, bigramCounts, drawBigramGraph
+from .counting.counting import documentTermMatrix, countTerms, mergeCounts, tokenize, TokenStore
 
 __version__ = '0.2.0'
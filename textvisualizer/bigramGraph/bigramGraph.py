@@ -2,13 +2,145 @@
 Module to make a bigram graph plot.
 """
 
-import networkx as nx
-import pandas as pd
-import matplotlib.pyplot as plt
-from collections import Counter
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from ..counting.counting import tokenize, _effectiveJobs, _split, _stopwordSet
+from ..textvisualizer import _newFigure, _graphLayout
+from ..instrument.instrument import instrumented
+from ..cache.cache import textsFingerprint, _cachedStatistics, _stopwordsKey
 
 
-def bigramGraph(listText, stopwords=None, total_bigrams=15):
+def _countBigrams(listText, stopwords=None):
+    """
+    Count the bigrams of each text of a list of texts.
+
+    The tokens are encoded as ids of a local vocabulary sorted alphabetically and each bigram
+    as the key left * V + right, where V is the size of the vocabulary. Stop words are removed
+    before pairing, and no bigram spans two texts.
+
+    Returns the vocabulary, the distinct keys and their counts.
+    """
+    stopwords = _stopwordSet(stopwords)
+    vocabulary = {}
+    ids = []
+    for text in listText:
+        # -1 marks the start of a text, so pairs never cross documents
+        ids.append(-1)
+        ids.extend(vocabulary.setdefault(token, len(vocabulary))
+                   for token in tokenize(text) if token not in stopwords)
+    terms = np.array(list(vocabulary), dtype=object)
+    order = np.argsort(terms, kind='stable')
+    rank = np.empty(len(terms), dtype=np.int64)
+    rank[order] = np.arange(len(terms))
+
+    ids = np.array(ids, dtype=np.int64)
+    left, right = ids[:-1], ids[1:]
+    valid = (left >= 0) & (right >= 0)
+    keys, counts = np.unique(rank[left[valid]] * len(terms) + rank[right[valid]], return_counts=True)
+    return terms[order], keys, counts
+
+
+def _countBigramsShard(args):
+    return _countBigrams(*args)
+
+
+@instrumented
+def _bigramCounter(listText, stopwords=None, n_jobs=None):
+    n_jobs = _effectiveJobs(n_jobs)
+    if n_jobs == 1:
+        return _countBigrams(listText, stopwords)
+
+    shards = [(shard, stopwords) for shard in _split(listText, n_jobs)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        partials = list(executor.map(_countBigramsShard, shards))
+
+    # re-key the pairs of every shard on the merged vocabulary
+    terms = np.unique(np.concatenate([shard_terms for shard_terms, keys, counts in partials]))
+    keys = [np.empty(0, dtype=np.int64)]
+    for shard_terms, shard_keys, counts in partials:
+        if len(shard_keys):
+            ids = np.searchsorted(terms, shard_terms)
+            keys.append(ids[shard_keys // len(shard_terms)] * len(terms) + ids[shard_keys % len(shard_terms)])
+    keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    counts = np.zeros(len(keys), dtype=np.int64)
+    np.add.at(counts, inverse, np.concatenate([counts for shard_terms, keys, counts in partials]))
+    return terms, keys, counts
+
+
+@instrumented
+def bigramCounts(listText, stopwords=None, total_bigrams=15, n_jobs=None):
+    """
+    Count the bigrams of a list of texts and keep the most frequent ones.
+
+    It is the data drawn by bigramGraph.
+
+    Parameters
+    ----------
+    listText : list of strings
+        The corpus of text.
+
+    stopwords : list of strings, default=None
+        That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+    total_bigrams : integer
+        The number of bigrams to be kept.
+
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+    Returns
+    -------
+    pandas DataFrame with the columns bigram, a tuple of two words, and count, sorted by decreasing count.
+
+    Notes
+    -----
+    When the statistics cache is on, the table is read from it if the same texts were
+    counted before with the same parameters. See configureStatisticsCache.
+    """
+    return _cachedStatistics(
+        lambda: ('bigramCounts', textsFingerprint(listText), _stopwordsKey(stopwords), total_bigrams),
+        lambda: _bigramTable(listText, stopwords, total_bigrams, n_jobs),
+        _encodeBigrams, _decodeBigrams)
+
+
+def _bigramTable(listText, stopwords=None, total_bigrams=15, n_jobs=None):
+    return _topBigrams(*_bigramCounter(listText, stopwords, n_jobs), total_bigrams)
+
+
+def _topBigrams(terms, keys, counts, total_bigrams):
+    """
+    Table of the most frequent bigrams, from the keys left * V + right of a sorted vocabulary.
+    """
+    import pandas as pd
+
+    total_bigrams = max(0, min(total_bigrams, len(keys)))
+    if 0 < total_bigrams < len(keys):
+        # only the bigrams as frequent as the last one kept need to be sorted
+        threshold = np.partition(counts, len(counts) - total_bigrams)[len(counts) - total_bigrams]
+        candidates = counts >= threshold
+        keys, counts = keys[candidates], counts[candidates]
+    # the vocabulary is sorted, so ties are broken by the bigram itself and
+    # the result does not depend on n_jobs
+    order = np.lexsort((keys, -counts))[:total_bigrams]
+    bigrams = [(terms[key // len(terms)], terms[key % len(terms)]) for key in keys[order]]
+    return pd.DataFrame({'bigram': bigrams, 'count': counts[order]}, columns=['bigram', 'count'])
+
+
+def _encodeBigrams(table):
+    return {'first': np.array([first for first, second in table['bigram']], dtype=str),
+            'second': np.array([second for first, second in table['bigram']], dtype=str),
+            'count': table['count'].to_numpy(dtype=np.int64)}
+
+
+def _decodeBigrams(arrays):
+    import pandas as pd
+
+    bigrams = list(zip(arrays['first'].astype(object), arrays['second'].astype(object)))
+    return pd.DataFrame({'bigram': bigrams, 'count': arrays['count']}, columns=['bigram', 'count'])
+
+
+@instrumented
+def bigramGraph(listText, stopwords=None, total_bigrams=15, n_jobs=None):
     """
     Make a graph of bigrams.
 
@@ -26,42 +158,45 @@ def bigramGraph(listText, stopwords=None, total_bigrams=15):
     total_bigrams : integer
         The number of bigrams that will appear on the graph.
 
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
     """
-    listText = [txt.lower() for txt in listText]
-    if stopwords is not None:
-        for i in range(0, len(listText)):
-            words = listText[i].split(" ")
-            words_new = [w for w in words if w not in stopwords]
-            listText[i] = ' '.join(words_new)
+    return drawBigramGraph(bigramCounts(listText, stopwords, total_bigrams, n_jobs))
 
-    text = " ".join(listText)
-    bigrams = [(a, b) for l in [text]
-               for a, b in zip(l.split(" ")[:-1], l.split(" ")[1:])]
-    bigrams = [(a, b) for a, b in bigrams if ((a != '') and (b != ''))]
 
-    # Create counter of words in clean bigrams
-    bigram_counts = Counter(bigrams)
+@instrumented
+def drawBigramGraph(table):
+    """
+    Draw the graph of a table of bigrams.
 
-    # Create a network plot of grouped terms
-    bigram_df = pd.DataFrame(bigram_counts.most_common(total_bigrams),
-                             columns=['bigram', 'count'])
+    Parameters
+    ----------
+    table : pandas DataFrame
+        Table with the columns bigram and count, as returned by bigramCounts.
 
-    # Create dictionary of bigrams and their counts
-    d = bigram_df.set_index('bigram').T.to_dict('records')
+    Returns
+    -------
+    matplotlib.figure.Figure
+    """
+    import networkx as nx
 
     # Create network plot
     G = nx.DiGraph()
 
     # Create connections between nodes
-    for k, v in d[0].items():
-        G.add_edge(k[0], k[1], weight=(v * 10))
+    for (first, second), count in zip(table['bigram'], table['count']):
+        G.add_edge(first, second, weight=(count * 10))
 
-    fig, ax = plt.subplots(figsize=(12, 8))
+    fig, ax = _newFigure(figsize=(12, 8))
 
     # Hide grid lines
     ax.grid(False)
 
-    pos = nx.circular_layout(G)
+    pos = _graphLayout(G)
     # Plot networks
     nx.draw_networkx(G, pos,
                      font_size=16,
@@ -71,3 +206,5 @@ def bigramGraph(listText, stopwords=None, total_bigrams=15):
                      node_shape='',
                      with_labels=True,
                      ax=ax)
+
+    return fig
@@ -2,9 +2,12 @@
 Module to draw a bubble chart plot
 This class was cloned from "https://matplotlib.org/stable/gallery/misc/packed_bubbles.html"
 """
+import math
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.feature_extraction.text import CountVectorizer
+from ..frequency.frequency import frequencyTable
+from ..textvisualizer import _newFigure
+from ..cache.cache import fingerprint, layoutCache
+from ..instrument.instrument import instrumented
 
 
 class BubbleChart:
@@ -72,61 +75,128 @@ class BubbleChart:
         idx_min = np.argmin(distance)
         return idx_min if type(idx_min) == np.ndarray else [idx_min]
 
-    def collapse(self, n_iterations=50):
+    def collapse(self, n_iterations=50, tolerance=0):
         """
         Move bubbles to the center of mass.
 
+        The bubbles are kept in a grid, so a bubble is only checked for collisions
+        against the bubbles of the neighbouring cells and the few bubbles too large
+        for a cell. The center of mass is updated after each move instead of being
+        recomputed from all bubbles.
+
         Parameters
         ----------
         n_iterations : int, default: 50
             Number of moves to perform.
+        tolerance : float, default: 0
+            If positive, the collapse stops early when the step becomes smaller than this
+            fraction of the largest bubble diameter, e.g. 1e-3. With 0, all n_iterations are performed.
         """
+        n = len(self.bubbles)
+        spacing = self.bubble_spacing
+        positions = self.bubbles[:, :2].copy()
+        radius = self.bubbles[:, 2]
+        weights = self.bubbles[:, 3]
+        total = weights.sum()
+        # plain floats are much faster than numpy scalars for one bubble at a time
+        x, y = positions[:, 0].tolist(), positions[:, 1].tolist()
+        r, w = radius.tolist(), weights.tolist()
+
+        # a cell holds any bubble up to twice the 90th percentile diameter, larger bubbles
+        # are few and are checked apart
+        cell = min(2 * radius.max(), 4 * np.percentile(radius, 90) + spacing) + spacing
+        large = radius * 2 + spacing > cell
+        large_ids = np.flatnonzero(large)
+        large_positions = positions[large_ids]
+        large_index = {i: k for k, i in enumerate(large_ids.tolist())}
+        grid = {}
+        for i in np.flatnonzero(~large).tolist():
+            grid.setdefault((x[i] // cell, y[i] // cell), []).append(i)
+
+        def colliding(i, px, py):
+            """
+            Closest bubble, by outline distance, colliding with bubble i moved to (px, py), or None.
+            """
+            if i in large_index:
+                distance = np.hypot(positions[:, 0] - px, positions[:, 1] - py) - radius
+                distance[i] = np.inf
+                j = int(np.argmin(distance))
+                return j if distance[j] - r[i] - spacing < 0 else None
+            # two grid bubbles collide only if their centers are less than a cell apart
+            closest, closest_distance = None, np.inf
+            cx, cy = px // cell, py // cell
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for j in grid.get((cx + dx, cy + dy), ()):
+                        distance = math.hypot(x[j] - px, y[j] - py) - r[j]
+                        # ties are broken by the smallest index, as in a scan of all bubbles
+                        if j != i and (distance < closest_distance or (distance == closest_distance and j < closest)):
+                            closest, closest_distance = j, distance
+            if len(large_ids):
+                distance = np.hypot(large_positions[:, 0] - px, large_positions[:, 1] - py) - radius[large_ids]
+                k = int(np.argmin(distance))
+                j = int(large_ids[k])
+                if distance[k] < closest_distance or (distance[k] == closest_distance and j < closest):
+                    closest, closest_distance = j, distance[k]
+            return closest if closest_distance - r[i] - spacing < 0 else None
+
+        def move(i, px, py):
+            if i in large_index:
+                large_positions[large_index[i]] = px, py
+            else:
+                old_cell, new_cell = (x[i] // cell, y[i] // cell), (px // cell, py // cell)
+                if old_cell != new_cell:
+                    grid[old_cell].remove(i)
+                    grid.setdefault(new_cell, []).append(i)
+            x[i], y[i] = px, py
+            positions[i] = px, py
+
         for _i in range(n_iterations):
+            # recompute the center of mass once per iteration to avoid drift
+            com_x, com_y = positions.T @ weights
             moves = 0
-            for i in range(len(self.bubbles)):
-                rest_bub = np.delete(self.bubbles, i, 0)
+            for i in range(n):
                 # try to move directly towards the center of mass
                 # direction vector from bubble to the center of mass
-                dir_vec = self.com - self.bubbles[i, :2]
-
-                # shorten direction vector to have length of 1
-                dir_vec = dir_vec / np.sqrt(dir_vec.dot(dir_vec))
-
+                dx, dy = com_x / total - x[i], com_y / total - y[i]
+                norm = math.hypot(dx, dy)
+                if norm == 0:
+                    continue
                 # calculate new bubble position
-                new_point = self.bubbles[i, :2] + dir_vec * self.step_dist
-                new_bubble = np.append(new_point, self.bubbles[i, 2:4])
+                px, py = x[i] + dx / norm * self.step_dist, y[i] + dy / norm * self.step_dist
 
                 # check whether new bubble collides with other bubbles
-                if not self.check_collisions(new_bubble, rest_bub):
-                    self.bubbles[i, :] = new_bubble
-                    self.com = self.center_of_mass()
+                j = colliding(i, px, py)
+                if j is None:
                     moves += 1
                 else:
-                    # try to move around a bubble that you collide with
-                    # find colliding bubble
-                    for colliding in self.collides_with(new_bubble, rest_bub):
-                        # calculate direction vector
-                        dir_vec = rest_bub[colliding, :2] - self.bubbles[i, :2]
-                        dir_vec = dir_vec / np.sqrt(dir_vec.dot(dir_vec))
-                        # calculate orthogonal vector
-                        orth = np.array([dir_vec[1], -dir_vec[0]])
-                        # test which direction to go
-                        new_point1 = (self.bubbles[i, :2] + orth *
-                                      self.step_dist)
-                        new_point2 = (self.bubbles[i, :2] - orth *
-                                      self.step_dist)
-                        dist1 = self.center_distance(
-                            self.com, np.array([new_point1]))
-                        dist2 = self.center_distance(
-                            self.com, np.array([new_point2]))
-                        new_point = new_point1 if dist1 < dist2 else new_point2
-                        new_bubble = np.append(new_point, self.bubbles[i, 2:4])
-                        if not self.check_collisions(new_bubble, rest_bub):
-                            self.bubbles[i, :] = new_bubble
-                            self.com = self.center_of_mass()
-
-            if moves / len(self.bubbles) < 0.1:
+                    # try to move around the bubble that you collide with
+                    dx, dy = x[j] - x[i], y[j] - y[i]
+                    norm = math.hypot(dx, dy)
+                    if norm == 0:
+                        continue
+                    # orthogonal vector, with the length of a step
+                    ox, oy = dy / norm * self.step_dist, -dx / norm * self.step_dist
+                    # test which direction to go
+                    if math.hypot(com_x / total - x[i] - ox, com_y / total - y[i] - oy) < \
+                            math.hypot(com_x / total - x[i] + ox, com_y / total - y[i] + oy):
+                        px, py = x[i] + ox, y[i] + oy
+                    else:
+                        px, py = x[i] - ox, y[i] - oy
+                    if colliding(i, px, py) is not None:
+                        continue
+                # update the center of mass with the move of this bubble only
+                com_x += (px - x[i]) * w[i]
+                com_y += (py - y[i]) * w[i]
+                move(i, px, py)
+
+            if moves / n < 0.1:
                 self.step_dist = self.step_dist / 2
+                if self.step_dist < tolerance * self.maxstep:
+                    break
+
+        self.bubbles[:, :2] = positions
+        self.com = self.center_of_mass()
 
     def plot(self, ax, labels, colors):
         """
@@ -140,15 +210,18 @@ class BubbleChart:
         colors : list
             Colors of the bubbles.
         """
+        from matplotlib.patches import Circle
+
         for i in range(len(self.bubbles)):
-            circ = plt.Circle(
+            circ = Circle(
                 self.bubbles[i, :2], self.bubbles[i, 2], color=colors[i])
             ax.add_patch(circ)
             ax.text(*self.bubbles[i, :2], labels[i],
                     horizontalalignment='center', verticalalignment='center')
 
 
-def bubbleChart(listText, number_of_words=20, stopwords=None, palette='blue', title=None):
+@instrumented
+def bubbleChart(listText, number_of_words=20, stopwords=None, palette='blue', title=None, n_jobs=None):
     """
     Plot a bubble chart.
 
@@ -171,19 +244,90 @@ def bubbleChart(listText, number_of_words=20, stopwords=None, palette='blue', ti
 
     title : str
         The title of the plot.
+
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
     """
     if palette not in ['red', 'green', 'blue']:
         raise BaseException('palette has to be blue, green or red.')
 
-    word_count_vect = CountVectorizer(
-        analyzer='word',  stop_words=stopwords)
-    word_count_vect.fit(listText)
+    return drawBubbleChart(frequencyTable(listText, number_of_words, stopwords, n_jobs=n_jobs), palette, title)
+
+
+@instrumented
+def bubbleLayout(area, bubble_spacing=0.1, n_iterations=50, tolerance=0):
+    """
+    Compute the positions of the bubbles of a bubble chart.
+
+    Parameters
+    ----------
+    area : array-like
+        Area of the bubbles, e.g. the count column of a frequency table.
+
+    bubble_spacing : float, default: 0.1
+        Minimal spacing between bubbles after collapsing.
+
+    n_iterations : int, default: 50
+        Number of moves to perform.
+
+    tolerance : float, default: 0
+        If positive, the collapse stops early when the step becomes smaller than this
+        fraction of the largest bubble diameter, e.g. 1e-3. With 0, all n_iterations are performed.
+
+    Returns
+    -------
+    numpy array of shape (number of bubbles, 3) with the x, y and radius of each bubble.
 
-    bag_of_words = word_count_vect.transform(listText)
-    sum_words = bag_of_words.sum(axis=0)
-    words_freq = [(word, sum_words[0, idx])
-                  for word, idx in word_count_vect.vocabulary_.items()]
-    words_freq = sorted(words_freq, key=lambda x: x[1], reverse=True)
+    Notes
+    -----
+    The layouts are kept in the layout cache, keyed by the areas and the parameters,
+    so charts of the same frequencies are collapsed only once. See configureLayoutCache.
+    """
+    if len(area) == 0:
+        return np.empty((0, 3))
+    area = np.asarray(area, dtype=np.float64)
+    key = fingerprint('bubbleLayout', area, float(bubble_spacing), int(n_iterations), float(tolerance))
+    cached = layoutCache.get(key)
+    if cached is None:
+        bubble_chart = BubbleChart(area=area, bubble_spacing=bubble_spacing)
+        bubble_chart.collapse(n_iterations, tolerance)
+        cached = {'bubbles': bubble_chart.bubbles[:, :3].copy()}
+        layoutCache.set(key, cached)
+    return cached['bubbles'].copy()
+
+
+@instrumented
+def drawBubbleChart(table, palette='blue', title=None, layout=None):
+    """
+    Draw the bubble chart of a frequency table.
+
+    Parameters
+    ----------
+    table : pandas DataFrame
+        Table with the columns words and count, as returned by frequencyTable.
+
+    palette : str
+        The palette colors to be used on the bubbles. The available options are "red", "green" and "blue". Default="blue".
+
+    title : str
+        The title of the plot.
+
+    layout : numpy array, default=None
+        Positions of the bubbles, as returned by bubbleLayout. If None, they are computed from the table.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+    """
+    from matplotlib.patches import Circle
+
+    if palette not in ['red', 'green', 'blue']:
+        raise BaseException('palette has to be blue, green or red.')
+    number_of_words = len(table)
 
     red = ['#d7301f', '#fc8d59', '#fdcc8a', '#fef0d9']
     blue = ['#2b8cbe', '#7bccc4', '#bae4bc', '#f0f9e8']
@@ -207,24 +351,17 @@ def bubbleChart(listText, number_of_words=20, stopwords=None, palette='blue', ti
         else:
             colors.append(col[3])
 
-    data = {
-        'tokens': [x for x, y in words_freq[:number_of_words]],
-        'frequency': [y for x, y in words_freq[:number_of_words]],
-        'color': colors
-    }
-
-    bubble_chart = BubbleChart(area=data['frequency'],
-                               bubble_spacing=0.1)
-
-    bubble_chart.collapse()
+    if layout is None:
+        layout = bubbleLayout(table['count'].to_numpy())
 
-    fig, ax = plt.subplots(subplot_kw=dict(aspect="equal"))
-    bubble_chart.plot(
-        ax, data['tokens'], data['color'])
+    fig, ax = _newFigure(aspect="equal")
+    for (x, y, r), token, color in zip(layout, table['words'], colors):
+        ax.add_patch(Circle((x, y), r, color=color))
+        ax.text(x, y, token, horizontalalignment='center', verticalalignment='center')
     ax.axis("off")
     ax.relim()
     ax.autoscale_view()
     if title is not None:
         ax.set_title(title)
 
-    plt.show()
+    return fig
@@ -0,0 +1,3 @@
+"""
+Module for caching computed results
+"""
@@ -0,0 +1,504 @@
+"""
+Module for caching computed results
+"""
+
+import os
+import sys
+import hashlib
+import tempfile
+import threading
+import numpy as np
+from collections import OrderedDict
+from collections.abc import Mapping
+
+
+def fingerprint(*parts):
+    """
+    Hash a sequence of arrays and values into a hexadecimal key.
+
+    Arrays are hashed by dtype, shape and content, any other value by its repr.
+    Sets are sorted and mappings are sorted by key first, so equal inputs give
+    the same key in every process.
+
+    Parameters
+    ----------
+    *parts : numpy arrays, lists, sets, mappings or scalars
+
+    Returns
+    -------
+    str
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            if part.dtype == object:
+                part = part.astype(str)
+            part = np.ascontiguousarray(part)
+            digest.update(("%s%s" % (part.dtype.str, part.shape)).encode())
+            digest.update(part.tobytes())
+        else:
+            digest.update(repr(_stable(part)).encode())
+        # separator, so ('ab', 'c') and ('a', 'bc') differ
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _stable(value):
+    """
+    Turn sets and mappings into sorted tuples, whose repr does not depend on the process.
+    """
+    if isinstance(value, (set, frozenset)):
+        return ('set', tuple(sorted(repr(_stable(item)) for item in value)))
+    if isinstance(value, Mapping):
+        return ('map', tuple(sorted((repr(_stable(key)), _stable(item)) for key, item in value.items())))
+    if isinstance(value, (list, tuple)):
+        return tuple(_stable(item) for item in value)
+    return value
+
+
+def textsFingerprint(listText, listLabels=None):
+    """
+    Hash the content of a list of texts, and of their labels, into a hexadecimal key.
+
+    Parameters
+    ----------
+    listText : iterable of strings
+
+    listLabels : iterable of strings, default=None
+
+    Returns
+    -------
+    str
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for text in listText:
+        data = text.encode('utf-8', 'surrogatepass')
+        # the length prefix keeps the boundaries of the texts
+        digest.update(b"%d:" % len(data))
+        digest.update(data)
+    if listLabels is not None:
+        digest.update(b"labels")
+        digest.update(repr(_stable(list(listLabels))).encode())
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe least recently used cache of numpy arrays.
+
+    Each entry is a dict of numeric numpy arrays. When a directory is given,
+    entries are also saved there as npz files, so they are shared by every
+    process that uses the same directory and survive the end of the process.
+
+    Parameters
+    ----------
+    maxsize : int, default=256
+        Maximum number of entries kept in memory. 0 disables the memory cache.
+
+    directory : str, default=None
+        Folder of the on-disk entries. None keeps the entries only in memory.
+
+    maxbytes : int, default=None
+        Maximum size of the on-disk entries. When it is exceeded, the least recently
+        used files are removed. None means no limit.
+    """
+
+    def __init__(self, maxsize=256, directory=None, maxbytes=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.maxbytes = maxbytes
+        self.__entries = OrderedDict()
+        self.__lock = threading.RLock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(maxsize={self.maxsize}, directory={self.directory!r}, maxbytes={self.maxbytes})"
+
+    def __str__(self):
+        return "Object of class LRUCache with %d of %d entries in memory" % (len(self), self.maxsize)
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__entries)
+
+    def __contains__(self, key):
+        with self.__lock:
+            if key in self.__entries:
+                return True
+        return self.directory is not None and os.path.exists(self.__path(key))
+
+    def __path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def __remember(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Return the entry of a key, or None when it is not cached.
+
+        Parameters
+        ----------
+        key : str
+
+        Returns
+        -------
+        dict of numpy arrays or None
+        """
+        with self.__lock:
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                return self.__entries[key]
+        if self.directory is None:
+            return None
+        path = self.__path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                value = {name: data[name] for name in data.files}
+        except (OSError, ValueError):
+            # missing, or being replaced by another process
+            return None
+        try:
+            # the modification time is the last use of the entry for the eviction
+            os.utime(path)
+        except OSError:
+            pass
+        self.__remember(key, value)
+        return value
+
+    def set(self, key, value):
+        """
+        Store the entry of a key.
+
+        Parameters
+        ----------
+        key : str
+
+        value : dict of numpy arrays
+        """
+        value = {name: np.asarray(array) for name, array in value.items()}
+        self.__remember(key, value)
+        if self.directory is None:
+            return
+        # write aside and rename, so readers never see a partial file
+        handle, temporary = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(handle, "wb") as file:
+                np.savez(file, **value)
+            os.replace(temporary, self.__path(key))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        if self.maxbytes is not None:
+            self.__evict()
+
+    def __evict(self):
+        """
+        Remove the least recently used files until the directory fits in maxbytes.
+
+        Other processes may remove the same files at the same time, so missing files are skipped.
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz"):
+                try:
+                    info = entry.stat()
+                except OSError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, entry.path))
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.maxbytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Remove every entry from memory. The on-disk entries are kept.
+        """
+        with self.__lock:
+            self.__entries.clear()
+
+
+layoutCache = LRUCache(maxbytes=2 ** 28)
+
+
+def configureLayoutCache(maxsize=256, directory=None, maxbytes=2 ** 28):
+    """
+    Configure the cache of the bubble chart layouts.
+
+    Parameters
+    ----------
+    maxsize : int, default=256
+        Maximum number of layouts kept in memory. 0 disables the memory cache.
+
+    directory : str, default=None
+        Folder where the layouts are also saved, so they are reused by other processes.
+        None keeps the layouts only in memory.
+
+    maxbytes : int, default=2 ** 28
+        Maximum size of the folder. The least recently used layouts are removed first.
+
+    Returns
+    -------
+    LRUCache
+        The layout cache.
+    """
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+    layoutCache.maxsize = maxsize
+    layoutCache.directory = directory
+    layoutCache.maxbytes = maxbytes
+    layoutCache.clear()
+    return layoutCache
+
+
+# results of the counting functions, kept on disk when a directory is configured
+statisticsCache = LRUCache(maxsize=0)
+
+
+def configureStatisticsCache(directory=None, maxbytes=2 ** 30):
+    """
+    Configure the persistent cache of the computed statistics.
+
+    When a directory is given, the frequency tables, bigram counts and phrase net edges are
+    saved there as npz files, keyed by a fingerprint of the texts and of the parameters, and
+    reused by every later call, in this process or another one. The cache is off by default.
+
+    Parameters
+    ----------
+    directory : str, default=None
+        Folder of the cache. None turns the cache off.
+
+    maxbytes : int, default=2 ** 30
+        Maximum size of the folder. The least recently used results are removed first.
+
+    Returns
+    -------
+    LRUCache
+        The statistics cache.
+    """
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+    statisticsCache.directory = directory
+    statisticsCache.maxbytes = maxbytes
+    return statisticsCache
+
+
+def _cachedStatistics(parts, compute, encode, decode):
+    """
+    Return the result of compute, read from the statistics cache when it is there.
+
+    parts is called only when the cache is on, and returns the values hashed into the key.
+    encode turns the result into a dict of numpy arrays without objects, decode does the reverse.
+    """
+    if statisticsCache.directory is None:
+        return compute()
+    key = fingerprint(*parts())
+    arrays = statisticsCache.get(key)
+    if arrays is not None:
+        return decode(arrays)
+    result = compute()
+    statisticsCache.set(key, encode(result))
+    return result
+
+
+def _stopwordsKey(stopwords):
+    """
+    A list of stop words is a set: its order does not change the result.
+    """
+    if stopwords is None or isinstance(stopwords, str):
+        return stopwords
+    return frozenset(stopwords)
+
+
+class ResultCache:
+    """
+    Thread-safe least recently used cache of computed results, bounded by their size in memory.
+
+    The entries are any Python results (data frames, graphs, arrays, dicts, tuples). They are
+    copied when stored and when read, so the caller can change a result without changing the
+    cache. Arrays are stored read-only and shared instead of copied.
+
+    Parameters
+    ----------
+    maxbytes : int, default=2 ** 28
+        Maximum estimated size of the entries. When it is exceeded, the least recently used
+        entries are removed. 0 disables the cache.
+    """
+
+    def __init__(self, maxbytes=2 ** 28):
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.RLock()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(maxbytes={self.maxbytes})"
+
+    def __str__(self):
+        return "Object of class ResultCache with %d entries in %d of %d bytes" % (len(self), self.nbytes, self.maxbytes)
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__entries)
+
+    def __contains__(self, key):
+        with self.__lock:
+            return key in self.__entries
+
+    def get(self, key):
+        """
+        Return a copy of the entry of a key, or None when it is not cached.
+
+        Parameters
+        ----------
+        key : hashable
+
+        Returns
+        -------
+        object or None
+        """
+        with self.__lock:
+            if key not in self.__entries:
+                return None
+            self.__entries.move_to_end(key)
+            value, size = self.__entries[key]
+        return _copyResult(value)
+
+    def set(self, key, value):
+        """
+        Store a copy of the entry of a key.
+
+        An entry larger than maxbytes is not stored.
+
+        Parameters
+        ----------
+        key : hashable
+
+        value : object
+        """
+        if self.maxbytes <= 0:
+            return
+        value = _copyResult(value)
+        size = _sizeOf(value)
+        if size > self.maxbytes:
+            return
+        with self.__lock:
+            self.__pop(key)
+            self.__entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.maxbytes:
+                self.__pop(next(iter(self.__entries)))
+
+    def __pop(self, key):
+        if key in self.__entries:
+            self.nbytes -= self.__entries.pop(key)[1]
+
+    def discard(self, owner):
+        """
+        Remove the entries whose key is a tuple starting with owner.
+
+        Parameters
+        ----------
+        owner : hashable
+        """
+        with self.__lock:
+            for key in [key for key in self.__entries if type(key) == tuple and key and key[0] == owner]:
+                self.__pop(key)
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.nbytes = 0
+
+
+# results of the methods of Corpus, kept in memory
+resultCache = ResultCache()
+
+
+def configureResultCache(maxbytes=2 ** 28):
+    """
+    Configure the memory cache of the results of the methods of Corpus.
+
+    Each result is kept under the normalized arguments of the method, so a chart drawn again,
+    with another package for example, does not count the texts again. The cache is shared by
+    every corpus and the results of a corpus are dropped when its texts or labels change.
+
+    Parameters
+    ----------
+    maxbytes : int, default=2 ** 28
+        Maximum estimated size of the results kept in memory. 0 disables the cache.
+
+    Returns
+    -------
+    ResultCache
+        The result cache.
+    """
+    resultCache.maxbytes = maxbytes
+    resultCache.clear()
+    return resultCache
+
+
+def _copyResult(value):
+    """
+    Copy a result, so the copy can be changed without changing the original.
+
+    Arrays are copied once into read-only arrays, which are then shared by every copy.
+    """
+    if isinstance(value, np.ndarray):
+        if not value.flags.writeable:
+            return value
+        value = value.copy()
+        value.setflags(write=False)
+        return value
+    if isinstance(value, (tuple, list)):
+        return type(value)(_copyResult(item) for item in value)
+    if isinstance(value, dict):
+        # dict.copy keeps the type of Counter and OrderedDict
+        value = value.copy()
+        for key in value:
+            value[key] = _copyResult(value[key])
+        return value
+    if hasattr(value, 'copy'):
+        # data frames and graphs
+        return value.copy()
+    return value
+
+
+def _sizeOf(value):
+    """
+    Estimate the memory used by a result, in bytes.
+    """
+    if isinstance(value, np.ndarray):
+        size = value.nbytes
+        if value.dtype == object:
+            size += sum(sys.getsizeof(item) for item in value.flat)
+        return size
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(_sizeOf(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeOf(key) + _sizeOf(item) for key, item in value.items())
+    if hasattr(value, 'memory_usage'):
+        # pandas data frame
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, 'adj'):
+        # networkx graph: its nodes and the attribute dicts of the edges
+        return sys.getsizeof(value) + sum(_sizeOf(node) + sys.getsizeof(value.adj[node]) for node in value) + \
+            sum(sys.getsizeof(data) for u, v, data in value.edges(data=True))
+    return sys.getsizeof(value)
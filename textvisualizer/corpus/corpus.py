@@ -3,28 +3,78 @@ Class Corpus
 """
 from ..textvisualizer import *
 from ..phraseNet.phraseNet import *
+from ..phraseNet.phraseNet import _phraseGraph
 from ..frequency.frequency import *
 from ..wordcloud.wordcloud import *
 from ..wordtree.wordtree import *
-from ..bubbleChart.bubbleChart import bubbleChart
-from ..lexicalDispersion.lexicalDispersion import lexicalDispersionPlot
-from ..correlation.correlation import wordCorrelationsPlot
-from ..bigramGraph.bigramGraph import bigramGraph
-import pandas as pd
+from ..bubbleChart.bubbleChart import bubbleChart, bubbleLayout, drawBubbleChart
+from ..lexicalDispersion.lexicalDispersion import lexicalDispersionPlot, dispersionOffsets, drawLexicalDispersion
+from ..correlation.correlation import wordCorrelationsPlot, wordCorrelations, drawWordCorrelations, drawWordCorrelationsPlotly
+from ..correlation.correlation import _correlationTerms, _phiCorrelations
+from ..bigramGraph.bigramGraph import bigramGraph, bigramCounts, drawBigramGraph
+from ..frequency.frequency import _drawFrequencyPlotYellowbrick
+from ..wordcloud.wordcloud import _drawWordcloudFromFrequencies, _wordcloudStopwords, _mergePlurals
+from ..counting.counting import documentTermMatrix, countTerms, TokenStore, _effectiveJobs
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import itertools
+import os
+import re
+import threading
+import weakref
+import numpy as np
+from ..instrument.instrument import instrumented
+from ..cache.cache import fingerprint, textsFingerprint, resultCache, _cachedStatistics, _stopwordsKey
+from ..frequency.frequency import _encodeTable, _decodeTable
+from ..bigramGraph.bigramGraph import _bigramTable, _topBigrams, _encodeBigrams, _decodeBigrams
+from ..phraseNet.phraseNet import _encodeGraph, _decodeGraph
+
+# identifiers of the corpora in the result cache
+_corpusIds = itertools.count()
 
 
 class Corpus:
     """
     Class Corpus to centralize functions.
+
+    A corpus built with Corpus.fromIterable or Corpus.fromFiles does not keep its texts
+    in memory. It only supports the frequency charts (frequencyPlot with matplotlib or plotly,
+    frequencyTreeMap, frequencyDonutChart, bubbleChart and wordcloudPlot), which are fed by
+    term counts accumulated one batch of documents at a time.
+
+    The results of the compute methods (frequencyTable, bigramCounts, phraseNetGraph,
+    vennMembership, dispersionOffsets, wordCorrelations, wordTreeNgrams, and the counts behind
+    frequencyByLabel and the word clouds) are kept in the result cache (see configureResultCache),
+    so a chart drawn again with the same arguments is not counted again. listText and listLabels
+    can be replaced or changed in place: the cached results of the corpus are then dropped.
+    The corpus keeps a copy of the lists it is given, so a list changed by the caller after
+    being given to the corpus does not change the corpus: change corpus.listText instead.
+
+    A corpus built with internTokens=True tokenizes its texts once into a TokenStore, a sorted
+    vocabulary and a flat array of uint32 token ids with the offsets of each text, and does not
+    keep the texts: listText is None and view is not available. Every chart is computed from
+    the ids, with the same results. Assigning listText interns the new texts.
+
+    When the statistics cache is on (see configureStatisticsCache), the results of frequencyTable,
+    bigramCounts and phraseNetGraph of a corpus in memory are kept on disk and reused by any
+    corpus with the same texts and labels.
     Attributes
     ----------
         listText : list of str
-            List of the corpus text.
+            List of the corpus text. None if the corpus is streamed or its tokens are interned.
         lisLabels : list of str
             List of corpus labels.
+        maxCachedMatrices : int
+            Class attribute with the number of document-term matrices, one per combination of
+            stopwords, ngramRange and vocabulary, kept by each corpus. The least recently used
+            matrix is dropped first. Default = 8.
     """
 
-    def __init__(self, listText, listLabels=None):
+    maxCachedMatrices = 8
+
+    def __init__(self, listText, listLabels=None, internTokens=False, n_jobs=None):
         """
         Constructor of the class Corpus
         Parameters
@@ -33,14 +83,107 @@ class Corpus:
             List of the corpus text.
         listLabels : list of str
             List of corpus labels.
+        internTokens : bool, default=False
+            Tokenize the texts once into a TokenStore shared by the charts, instead of keeping the texts.
+        n_jobs : int, default=None
+            Number of processes used to intern the texts. None means 1 and -1 means all processors.
         """
         if (listLabels is not None):
             if len(listText) != len(listLabels):
                 raise BaseException(
                     "Mismatch in lengths of listLabels and listText")
 
+        self.__changes = 0
+        self.__internTokens = internTokens
+        self.__internJobs = n_jobs
+        self.__tokenStore = None
         self.listText = listText
         self.listLabels = listLabels
+        self.__labelIndex = self.__buildLabelIndex(listLabels)
+        self.__labelMatrix = None
+        self.__dtmCache = OrderedDict()
+        self.__countsCache = OrderedDict()
+        self.__phraseIndex = None
+        self.__fingerprint = None
+        self.__source = None
+        self.__batchSize = None
+        self.__state = self.__currentState()
+        # guards the lazily computed caches when the corpus is shared by threads
+        self.__lock = threading.RLock()
+        self.__register()
+
+    @classmethod
+    def fromIterable(cls, iterable, batch_size=10000):
+        """
+        Build a streamed corpus from an iterable of texts.
+
+        The texts are not kept in memory: they are read again, batch_size texts at a time,
+        each time new term counts are needed. If the iterable can be consumed only once
+        (a generator, for example), only the first count is possible.
+
+        Parameters
+        ----------
+        iterable : iterable of str
+            The texts of the corpus.
+
+        batch_size : int
+            Number of texts counted at once.
+
+        Returns
+        -------
+        Corpus
+        """
+        consumed = []
+
+        def source():
+            if iter(iterable) is iterable:
+                if consumed:
+                    raise BaseException(
+                        "The iterable of the corpus was already consumed. Use a list or Corpus.fromFiles.")
+                consumed.append(True)
+            return iter(iterable)
+
+        corpus = cls(None)
+        corpus.__source = source
+        corpus.__batchSize = batch_size
+        return corpus
+
+    @classmethod
+    def fromFiles(cls, paths, encoding='utf-8', batch_size=10000):
+        """
+        Build a streamed corpus from line-delimited text files.
+
+        Each line of the files is a text. The files are read again, batch_size lines at a time,
+        each time new term counts are needed, so the corpus does not have to fit in memory.
+
+        Parameters
+        ----------
+        paths : str or list of str
+            Paths of the files.
+
+        encoding : str
+            Encoding of the files.
+
+        batch_size : int
+            Number of texts counted at once.
+
+        Returns
+        -------
+        Corpus
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+
+        def source():
+            for path in paths:
+                with open(path, encoding=encoding) as file:
+                    for line in file:
+                        yield line.rstrip('\n')
+
+        corpus = cls(None)
+        corpus.__source = source
+        corpus.__batchSize = batch_size
+        return corpus
 
     def __repr__(self):
         return "{self.__class__.__name__}()".format(self=self)
@@ -48,16 +191,162 @@ class Corpus:
     def __str__(self):
         return "Object of class {self.__class__.__name__}".format(self=self)
 
-    def __mountDataframe(self, labels):
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_Corpus__lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.RLock()
+        # a copy (copy.copy or pickle) has its own lists, caches and results, so it can be
+        # changed without changing the original; the cached matrices are never changed and are shared
+        self.__listText = None if self.__listText is None else self.__listText.copy()
+        self.__listLabels = None if self.__listLabels is None else self.__listLabels.copy()
+        self.__labelIndex = None if self.__labelIndex is None else dict(self.__labelIndex)
+        self.__dtmCache = OrderedDict(self.__dtmCache)
+        self.__countsCache = OrderedDict(self.__countsCache)
+        self.__register()
+
+    def __register(self):
         """
-        Private method to mount a dataframe with the corpus and labels.
+        Private method to give the corpus its identifier in the result cache.
+
+        The results of the corpus are removed from the cache when the corpus is deleted.
+        """
+        self.__id = next(_corpusIds)
+        weakref.finalize(self, resultCache.discard, self.__id)
+
+    @property
+    def listText(self):
+        """
+        List of the corpus texts. None if the corpus is streamed or its tokens are interned.
+
+        The corpus keeps a copy of the list it is given, so later changes to the caller's
+        list are not seen by the corpus. Changes made through corpus.listText are tracked.
+        A corpus with interned tokens only keeps the tokens of the list it is given.
+        """
+        return self.__listText
+
+    @listText.setter
+    def listText(self, listText):
+        if self.__internTokens and listText is not None:
+            self.__tokenStore = TokenStore(listText, self.__internJobs)
+            self.__listText = None
+        else:
+            self.__listText = listText if listText is None or type(listText) == _TrackedList else _TrackedList(listText)
+        self.__changes += 1
+
+    @property
+    def listLabels(self):
+        """
+        List of the corpus labels.
+
+        The corpus keeps a copy of the list it is given, so later changes to the caller's
+        list are not seen by the corpus. Changes made through corpus.listLabels are tracked.
+        """
+        return self.__listLabels
+
+    @listLabels.setter
+    def listLabels(self, listLabels):
+        self.__listLabels = listLabels if listLabels is None or type(listLabels) == _TrackedList else _TrackedList(listLabels)
+        self.__changes += 1
+
+    def __currentState(self):
+        """
+        Private method to get a value that changes whenever the texts or the labels change.
+        """
+        return (self.__changes,
+                None if self.__listText is None else self.__listText.version,
+                None if self.__listLabels is None else self.__listLabels.version)
+
+    def __size(self):
+        """
+        Private method to get the number of texts of the corpus. None if the corpus is streamed.
+        """
+        if self.__tokenStore is not None:
+            return len(self.__tokenStore)
+        return None if self.__listText is None else len(self.__listText)
+
+    def __sync(self):
+        """
+        Private method to drop the caches of the corpus if its texts or labels changed since they were computed.
+        """
+        if self.__state == self.__currentState():
+            return
+        with self.__lock:
+            state = self.__currentState()
+            if self.__state == state:
+                return
+            if self.__listLabels is not None and self.__size() != len(self.__listLabels):
+                raise BaseException(
+                    "Mismatch in lengths of listLabels and listText")
+            self.__labelIndex = self.__buildLabelIndex(self.__listLabels)
+            self.__labelMatrix = None
+            self.__dtmCache = OrderedDict()
+            self.__countsCache = OrderedDict()
+            self.__phraseIndex = None
+            self.__fingerprint = None
+            self.__state = state
+            resultCache.discard(self.__id)
+
+    def __memo(self, parts, compute):
+        """
+        Private method to read the result of a method from the result cache, or compute and keep it.
+
+        parts are the name of the method and its normalized arguments. The key also holds the
+        identifier of the corpus and the state of its texts and labels.
+        """
+        self.__sync()
+        if resultCache.maxbytes <= 0:
+            return compute()
+        key = (self.__id, self.__state) + parts
+        try:
+            result = resultCache.get(key)
+        except TypeError:
+            # an argument that can not be hashed
+            return compute()
+        if result is None:
+            result = compute()
+            resultCache.set(key, result)
+        return result
+
+    def __checkInMemory(self):
+        """
+        Private method to raise an error if the texts of the corpus are not in memory.
+        """
+        self.__sync()
+        if self.__source is not None:
+            raise BaseException(
+                "This corpus is streamed and only supports frequency counts.")
+
+    @staticmethod
+    def __buildLabelIndex(listLabels):
+        """
+        Private method to map each label to the positions of its texts.
+
+        Returns a dict of numpy int arrays, or None if there are no labels.
+        """
+        import pandas as pd
+
+        if listLabels is None:
+            return None
+        codes, uniques = pd.factorize(pd.Series(listLabels, dtype=object))
+        order = np.argsort(codes, kind='stable')
+        # texts without label have code -1
+        order = order[codes[order] >= 0]
+        bounds = np.cumsum(np.bincount(
+            codes[codes >= 0], minlength=len(uniques)))[:-1]
+        return dict(zip(uniques, np.split(order, bounds)))
+
+    def __rows(self, labels):
+        """
+        Private method to get the positions of the texts with the given labels.
 
         It check if the given label is valid.
 
         Raise an error if self.listLabels is None or parameter label is not a string or a list of string.
 
-        Returns a pandas DataFrame if it's everything ok with the labels.
-
         Parameters
         ----------
         labels : str or list of str, default=None
@@ -65,22 +354,308 @@ class Corpus:
 
         Returns
         -------
-        Pandas DataFrame.
+        numpy array of int, in the original order of the texts.
         """
-        if self.listLabels is not None:
-            df = pd.DataFrame(
-                {"text": self.listText, "label": self.listLabels})
-        else:
+        self.__sync()
+        if self.__labelIndex is None:
             raise BaseException("The listLabels is None.")
+        empty = np.array([], dtype=np.intp)
         if type(labels) == str:
-            df = df[df.label == labels]
+            return self.__labelIndex.get(labels, empty)
         elif type(labels) == list:
-            df = df[df.label.isin(labels)]
+            rows = [self.__labelIndex.get(label, empty) for label in set(labels)]
+            return np.sort(np.concatenate(rows)) if rows else empty
         else:
             raise BaseException("labels must be string or list of string")
-        return df
 
-    def frequencyPlot(self, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None, labels=None, package='matplotlib'):
+    def view(self, labels):
+        """
+        Get a view of the texts with the given labels.
+
+        Parameters
+        ----------
+        labels : str or list of str
+            Labels to be used to filter the text.
+
+        Returns
+        -------
+        CorpusView
+        """
+        self.__checkInMemory()
+        if self.__internTokens:
+            raise BaseException(
+                "This corpus only keeps the tokens of its texts.")
+        return CorpusView(self, self.__rows(labels))
+
+    def __labelIndicatorMatrix(self):
+        """
+        Private method to get the sparse label-indicator matrix of the corpus.
+
+        Row i of the matrix has a one in the column of every text with the i-th label.
+
+        Returns
+        -------
+        tuple (list of labels, scipy.sparse.csr_matrix)
+        """
+        import scipy.sparse as sp
+
+        self.__sync()
+        if self.__labelIndex is None:
+            raise BaseException("The listLabels is None.")
+        with self.__lock:
+            if self.__labelMatrix is None:
+                uniques = list(self.__labelIndex.keys())
+                rows = np.repeat(np.arange(len(uniques)), [len(self.__labelIndex[label]) for label in uniques])
+                cols = np.concatenate(list(self.__labelIndex.values())) if uniques else np.array([], dtype=np.intp)
+                matrix = sp.csr_matrix((np.ones(len(cols), dtype=np.int64), (rows, cols)),
+                                       shape=(len(uniques), self.__size()))
+                self.__labelMatrix = (uniques, matrix)
+            return self.__labelMatrix
+
+    def __texts(self, labels=None):
+        """
+        Private method to get the texts to be used by a chart.
+
+        Returns self.listText if labels is None, otherwise a CorpusView of the selected texts.
+        """
+        self.__checkInMemory()
+        if labels is None:
+            return self.listText
+        return self.view(labels)
+
+    @instrumented
+    def __documentTermMatrix(self, stopwords=None, ngramRange=(1, 1), vocabulary=None, labels=None, n_jobs=None):
+        """
+        Private method to get the document-term matrix of the corpus.
+
+        The matrix is computed once for each combination of stopwords, ngramRange and
+        vocabulary and kept in the corpus, so every chart reuses the same tokenization.
+        If labels are given, the rows of the matching texts are sliced out of the cached matrix.
+
+        Parameters
+        ----------
+        stopwords : list of strings, default=None
+            That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+        ngramRange : tuple (min_n, max_n), default=(1, 1)
+            The lower and upper boundary of the range of n-values for different
+            word n-grams to be extracted.
+
+        vocabulary : Mapping or iterable, default=None
+            Either a Mapping (e.g., a dict) where keys are terms and values are
+            indices in the feature matrix, or an iterable over terms.
+
+        labels : str or list of str, default=None
+            Labels to be used to filter the text.
+
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+        Returns
+        -------
+        tuple (scipy.sparse.csr_matrix, numpy.ndarray)
+            The document-term matrix and the terms of its columns.
+        """
+        self.__checkInMemory()
+
+        bag_of_words, terms = self.__bounded(
+            self.__dtmCache, self.__cacheKey(stopwords, ngramRange, vocabulary),
+            lambda: self.__vectorize(stopwords, ngramRange, vocabulary, n_jobs=n_jobs))
+        if labels is not None:
+            bag_of_words = bag_of_words[self.__rows(labels)]
+        return bag_of_words, terms
+
+    def __vectorize(self, stopwords=None, ngramRange=(1, 1), vocabulary=None, labels=None, n_jobs=None):
+        """
+        Private method to build a document-term matrix of the corpus, which is not cached.
+
+        A corpus with interned tokens reads its TokenStore, the others tokenize their texts.
+        """
+        if self.__internTokens:
+            bag_of_words, terms = self.__tokenStoreOf().documentTermMatrix(stopwords, ngramRange, vocabulary)
+            if labels is not None:
+                bag_of_words = bag_of_words[self.__rows(labels)]
+            return bag_of_words, terms
+        return documentTermMatrix(self.__texts(labels), stopwords=stopwords, ngramRange=ngramRange,
+                                  vocabulary=vocabulary, n_jobs=n_jobs)
+
+    @instrumented
+    def __termCounts(self, stopwords=None, ngramRange=(1, 1), vocabulary=None, labels=None, n_jobs=None):
+        """
+        Private method to get the total count of each term of the corpus.
+
+        For a corpus in memory, the cached document-term matrix is summed over the rows of the
+        given labels. For a streamed corpus, the texts are counted one batch at a time and the
+        totals are cached.
+
+        Returns
+        -------
+        tuple (numpy array of int, numpy array of strings)
+            The count of each term and the terms.
+        """
+        if self.__source is None:
+            bag_of_words, terms = self.__documentTermMatrix(
+                stopwords, ngramRange, vocabulary, labels, n_jobs)
+            return np.asarray(bag_of_words.sum(axis=0)).ravel(), terms
+        if labels is not None:
+            self.__rows(labels)
+        return self.__bounded(
+            self.__countsCache, self.__cacheKey(stopwords, ngramRange, vocabulary),
+            lambda: countTerms(self.__source(), stopwords=stopwords, ngramRange=ngramRange,
+                               vocabulary=vocabulary, batch_size=self.__batchSize, n_jobs=n_jobs))
+
+    def __bounded(self, cache, key, compute):
+        """
+        Private method to read a key of a cache of the corpus, or compute and keep it.
+
+        The cache keeps at most maxCachedMatrices entries and drops the least recently used one first.
+        """
+        with self.__lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+            value = compute()
+            cache[key] = value
+            while len(cache) > self.maxCachedMatrices:
+                cache.popitem(last=False)
+            return value
+
+    @instrumented
+    def __labelCounts(self, stopwords=None, ngramRange=(1, 1), vocabulary=None, labels=None, n_jobs=None):
+        """
+        Private method to get the term counts of every label at once.
+
+        Returns
+        -------
+        tuple (list of labels, scipy.sparse.csr_matrix, numpy array of strings)
+            The labels, the matrix with the count of each term (columns) for each label (rows) and the terms.
+        """
+        uniques, label_matrix = self.__labelIndicatorMatrix()
+        if labels is not None:
+            if type(labels) == str:
+                labels = [labels]
+            elif type(labels) != list:
+                raise BaseException("labels must be string or list of string")
+            selected = [i for i, label in enumerate(uniques) if label in labels]
+            uniques = [uniques[i] for i in selected]
+            label_matrix = label_matrix[selected]
+        bag_of_words, terms = self.__documentTermMatrix(
+            stopwords, ngramRange, vocabulary, n_jobs=n_jobs)
+        return uniques, (label_matrix @ bag_of_words).tocsr(), terms
+
+    @instrumented
+    def __phraseIndexOf(self, n_jobs=None):
+        """
+        Private method to get the PhraseIndex of the corpus, built on the first call.
+        """
+        self.__checkInMemory()
+        with self.__lock:
+            if self.__phraseIndex is None:
+                if self.__internTokens:
+                    self.__phraseIndex = PhraseIndex.fromTokens(self.__tokenStoreOf())
+                else:
+                    self.__phraseIndex = PhraseIndex(self.listText, n_jobs)
+            return self.__phraseIndex
+
+    def __tokenStoreOf(self):
+        """
+        Private method to get the TokenStore of a corpus with interned tokens, built with its texts.
+        """
+        self.__checkInMemory()
+        return self.__tokenStore
+
+    def __statistics(self, parts, compute, encode, decode):
+        """
+        Private method to read a result from the statistics cache, or compute and store it.
+
+        The key is made of the fingerprint of the texts and labels of the corpus, computed once,
+        and of the given parts. A corpus with interned tokens is fingerprinted by its tokens.
+        A streamed corpus is not cached, since its texts are not in memory.
+        """
+        self.__sync()
+        if self.__source is not None:
+            return compute()
+
+        def key():
+            with self.__lock:
+                if self.__fingerprint is None and self.__internTokens:
+                    # the texts are not kept, the tokens identify them
+                    store = self.__tokenStore
+                    self.__fingerprint = fingerprint('tokens', store.terms, store.ids, store.offsets,
+                                                     None if self.listLabels is None else list(self.listLabels))
+                elif self.__fingerprint is None:
+                    self.__fingerprint = textsFingerprint(self.listText, self.listLabels)
+            # labels select the same texts in any order
+            labels = parts[-1] if type(parts[-1]) != list else sorted(set(parts[-1]))
+            return ('Corpus',) + parts[:-1] + (self.__fingerprint, labels)
+
+        return _cachedStatistics(key, compute, encode, decode)
+
+    @staticmethod
+    def __cacheKey(stopwords, ngramRange, vocabulary):
+        """
+        Private method to turn the vectorization parameters into a hashable key.
+        """
+        if stopwords is not None and not isinstance(stopwords, str):
+            stopwords = frozenset(stopwords)
+        if isinstance(vocabulary, Mapping):
+            vocabulary = tuple(sorted(vocabulary.items(), key=lambda x: x[1]))
+        elif vocabulary is not None:
+            vocabulary = tuple(vocabulary)
+        return (stopwords, tuple(ngramRange), vocabulary)
+
+    @staticmethod
+    def __labelsKey(labels):
+        """
+        Private method to turn the labels into a hashable key. A list of labels selects the same texts in any order.
+        """
+        if type(labels) == list:
+            return tuple(sorted(set(labels)))
+        return labels
+
+    @instrumented
+    def frequencyTable(self, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None, labels=None, n_jobs=None):
+        """
+        Count the tokens of the corpus and keep the most frequent ones.
+
+        It is the data behind the frequency charts and the bubble chart.
+
+        Parameters
+        ----------
+        number_of_words : int
+            Number of words to be kept.
+
+        stopwords : list of strings, default=None
+            That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+        ngramRange : tuple (min_n, max_n), default=(1, 1)
+            The lower and upper boundary of the range of n-values for different
+            word n-grams to be extracted.
+
+        vocabulary : Mapping or iterable, default=None
+            Either a Mapping (e.g., a dict) where keys are terms and values are
+            indices in the feature matrix, or an iterable over terms.
+
+        labels : str or list of str, default=None
+            Labels to be used to filter the text.
+
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+        Returns
+        -------
+        pandas DataFrame with the columns words and count, sorted by decreasing count.
+        """
+        return self.__memo(
+            ('frequencyTable', number_of_words, self.__cacheKey(stopwords, ngramRange, vocabulary), self.__labelsKey(labels)),
+            lambda: self.__statistics(
+                ('frequencyTable', number_of_words, _stopwordsKey(stopwords), tuple(ngramRange), vocabulary, labels),
+                lambda: topFrequencies(
+                    *self.__termCounts(stopwords, ngramRange, vocabulary, labels, n_jobs), number_of_words),
+                _encodeTable, _decodeTable))
+
+    @instrumented
+    def frequencyPlot(self, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None, labels=None, package='matplotlib', n_jobs=None):
         """
         Plot a bar graph with the token frequencies.
 
@@ -114,43 +689,31 @@ class Corpus:
             Flag to indicate the use of the package.
             Default = 'matplotlib'. Others options are 'plotly' and 'yellowbrick'.
 
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
         Returns
         -------
-        matplotlib plot.
+        matplotlib.figure.Figure
         if package is plotly, it returns plotly.graph_objs._figure.Figure.
-        if package is yellowbrick, it returns a yellowbrick plot.
+        if package is yellowbrick, it returns the matplotlib.figure.Figure of a yellowbrick plot.
         """
         if package not in ['matplotlib', 'plotly', 'yellowbrick']:
             Warning('Wrong package defined. I am going to use matplotlib!!')
             package = 'matplotlib'
-        if labels is None:
-            if package == 'plotly':
-                return frequencyPlotly(self.listText, number_of_words=number_of_words,
-                                       stopwords=stopwords, ngramRange=ngramRange, vocabulary=vocabulary)
-            elif package == 'matplotlib':
-                return frequencyPlot(self.listText, number_of_words=number_of_words,
-                                     stopwords=stopwords, ngramRange=ngramRange, vocabulary=vocabulary)
-            elif package == 'yellowbrick':
-                return frequencyPlotYellowbrick(self.listText, number_of_words=number_of_words,
-                                                stopwords=stopwords, ngramRange=ngramRange, vocabulary=vocabulary)
-            else:
-                raise('Wrong package parameter defined.')
+        if package == 'yellowbrick':
+            docs, features = self.__documentTermMatrix(
+                stopwords, ngramRange, vocabulary, labels, n_jobs)
+            return _drawFrequencyPlotYellowbrick(docs, features, number_of_words)
+        table = self.frequencyTable(
+            number_of_words, stopwords, ngramRange, vocabulary, labels, n_jobs)
+        if package == 'plotly':
+            return drawFrequencyPlotly(table)
         else:
-            df = self.__mountDataframe(labels=labels)
-            if package == 'plotly':
-                return frequencyPlotly(df.text.tolist(), number_of_words=number_of_words,
-                                       stopwords=stopwords, ngramRange=ngramRange, vocabulary=vocabulary)
-            elif package == 'matplotlib':
-                return frequencyPlot(df.text.tolist(), number_of_words=number_of_words,
-                                     stopwords=stopwords, ngramRange=ngramRange, vocabulary=vocabulary)
-            elif package == 'yellowbrick':
-                return frequencyPlotYellowbrick(df.text.tolist(), number_of_words=number_of_words,
-                                                stopwords=stopwords, ngramRange=ngramRange, vocabulary=vocabulary)
-            else:
-                raise('Wrong package parameter defined.')
-        return fig
-
-    def frequencyTreeMap(self, number_of_words=100, stopwords=None, ngramRange=(1, 1), vocabulary=None, labels=None):
+            return drawFrequencyPlot(table)
+
+    @instrumented
+    def frequencyTreeMap(self, number_of_words=100, stopwords=None, ngramRange=(1, 1), vocabulary=None, labels=None, n_jobs=None):
         """
         Plot a tree map with the token frequencies.
 
@@ -184,18 +747,58 @@ class Corpus:
         labels : str or list of str, default=None
             Labels to be used to filter the text.
 
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
         Returns
         -------
             plotly.graph_objs._figure.Figure
         """
-        if labels is None:
-            return frequencyTreeMap(self.listText, number_of_words=number_of_words, stopwords=stopwords, ngramRange=ngramRange, vocabulary=vocabulary)
+        table = self.frequencyTable(
+            number_of_words, stopwords, ngramRange, vocabulary, labels, n_jobs)
+        return drawFrequencyTreeMap(table)
 
-        else:
-            df = self.__mountDataframe(labels=labels)
-            return frequencyTreeMap(df.text.tolist(), number_of_words=number_of_words, stopwords=stopwords, ngramRange=ngramRange, vocabulary=vocabulary)
+    @instrumented
+    def phraseNetGraph(self, connectors, number_of_pairs=20, labels=None, n_jobs=None):
+        """
+        Build the Phrase net graph of the texts.
+
+        The texts are tokenized once, in a PhraseIndex kept in the corpus, and every
+        following call only reads the positions of the connectors from the index.
+
+        Parameters
+        ----------
+        connectors : list of strings
+            List of connectors to be used in the construction of the graph.
+            A connector can have several words, like "of the".
+
+        number_of_pairs : int
+            Number of pairs of words to create the graph.
+
+        labels : str or list of str, default=None
+            Labels to be used to filter the text.
+
+        n_jobs : int, default=None
+            Number of processes used to build the index. None means 1 and -1 means all processors.
 
-    def phraseNet(self, connectors, number_of_pairs=20, labels=None, plotly=False):
+        Returns
+        -------
+        networkx.DiGraph
+        """
+        def graph():
+            rows = None if labels is None else self.__rows(labels)
+            return _phraseGraph(self.__phraseIndexOf(n_jobs).phraseCounts(connectors, rows), number_of_pairs)
+
+        def compute():
+            G = self.__statistics(('phraseNetGraph', list(connectors), number_of_pairs, labels),
+                                  graph, _encodeGraph, _decodeGraph)
+            G.graph['connectors'] = list(connectors)
+            return G
+
+        return self.__memo(('phraseNetGraph', tuple(connectors), number_of_pairs, self.__labelsKey(labels)), compute)
+
+    @instrumented
+    def phraseNet(self, connectors, number_of_pairs=20, labels=None, plotly=False, n_jobs=None):
         """
         Plot the Phrase net of a list of texts.
 
@@ -216,41 +819,34 @@ class Corpus:
             Flag to indicate the use of the plotly package.
             Default = False
 
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
         Returns
         -------
-        networkx draw figure.
+        matplotlib.figure.Figure with the networkx drawing.
         if plotly is true, it returns plotly.graph_objs._figure.Figure
         """
-        if labels is None:
-            if plotly:
-                return phraseNetPlotly(self.listText, connectors=connectors,
-                                       number_of_pairs=number_of_pairs)
-            else:
-                return phraseNet(self.listText, connectors=connectors,
-                                 number_of_pairs=number_of_pairs)
-
+        G = self.phraseNetGraph(connectors, number_of_pairs, labels, n_jobs)
+        if plotly:
+            return drawPhraseNetPlotly(G)
         else:
-            df = self.__mountDataframe(labels=labels)
-            if plotly:
-                return phraseNetPlotly(df.text.tolist(), connectors=connectors,
-                                       number_of_pairs=number_of_pairs)
-            else:
-                return phraseNet(df.text.tolist(), connectors=connectors,
-                                 number_of_pairs=number_of_pairs)
+            return drawPhraseNet(G)
 
-    def wordcloudPlot(self, stopwords=None, max_font_size=50, max_words=100, background_color="white", labels=None):
+    @instrumented
+    def wordcloudPlot(self, stopwords=None, max_font_size=50, max_words=100, background_color="white", labels=None, n_jobs=None):
         """
         Generate Word cloud figure.
 
-        It uses the wordcloud package under the hood.
+        It uses the wordcloud package under the hood. As in that package, the count of a
+        plural ending with "s" is added to its singular when both are in the texts.
 
         Parameters
         ----------
-        text : string
-            List of text to be used as text source in the construction of the graph.
-
         stopwords : list of strings, default=None
             That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+            If None, the stop words of the wordcloud package are used. The stop words are lowercased
+            and split in tokens like the texts.
 
         max_font_size : int or None (default=50)
             Maximum font size for the largest word. If None, height of the image is used.
@@ -260,14 +856,92 @@ class Corpus:
 
         labels : str or list of str, default=None
             Labels to be used to filter the text.
+
+        n_jobs : int, default=None
+            Number of processes used to count the texts of a streamed corpus.
+            None means 1 and -1 means all processors.
+
+        Returns
+        -------
+        matplotlib.figure.Figure
         """
-        if labels is None:
-            return wordcloudPlot(' '.join(self.listText), stopwords=stopwords, max_font_size=max_font_size, max_words=max_words, background_color=background_color)
+        stopwords = _wordcloudStopwords(stopwords)
+
+        def compute():
+            # the cloud is laid out from the shared term counts, the texts are never joined
+            counts, terms = self.__termCounts(stopwords, labels=labels, n_jobs=n_jobs)
+            counts, indices = _mergePlurals(counts, terms)
+            table = topFrequencies(counts, terms, max_words, indices=indices)
+            return dict(zip(table['words'], table['count']))
+
+        frequencies = self.__memo(
+            ('wordcloudPlot', _stopwordsKey(stopwords), max_words, self.__labelsKey(labels)), compute)
+        return _drawWordcloudFromFrequencies(frequencies, max_font_size=max_font_size,
+                                             max_words=max_words, background_color=background_color)
+
+    @instrumented
+    def wordcloudsByLabel(self, stopwords=None, max_font_size=50, max_words=100, background_color="white", labels=None, out_dir=None, n_jobs=None):
+        """
+        Generate one word cloud per label.
 
-        else:
-            df = self.__mountDataframe(labels=labels)
-            return wordcloudPlot(' '.join(df.text.tolist()), stopwords=stopwords, max_font_size=max_font_size, max_words=max_words, background_color=background_color)
+        The term counts of all labels come from a single sparse product between the
+        label-indicator matrix and the document-term matrix of the corpus, and the
+        clouds are generated in parallel from those counts. The plurals of each label are
+        counted with their singular, as in wordcloudPlot.
+
+        Parameters
+        ----------
+        stopwords : list of strings, default=None
+            That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+            If None, the stop words of the wordcloud package are used. The stop words are lowercased
+            and split in tokens like the texts.
+
+        max_font_size : int or None (default=50)
+            Maximum font size for the largest word. If None, height of the image is used.
 
+        max_words : number (default=100)
+            The maximum number of words.
+
+        labels : str or list of str, default=None
+            Labels to be drawn. If None, all labels of the corpus are used.
+
+        out_dir : str, default=None
+            Directory where the clouds are written as <position>_<label>.png, the position of the label in
+            the result and the label with every character other than a letter, a digit, "-" or "_" replaced
+            by "_". If None, the images are returned as arrays.
+
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts and to generate the clouds.
+            None means 1 and -1 means all processors.
+
+        Returns
+        -------
+        dict with the numpy array of shape (height, width, 3) of each label.
+        if out_dir is given, dict with the path of the png file of each label.
+        """
+        stopwords = _wordcloudStopwords(stopwords)
+
+        def compute():
+            uniques, label_counts, terms = self.__labelCounts(stopwords, labels=labels, n_jobs=n_jobs)
+            listFrequencies = []
+            for i in range(len(uniques)):
+                start, end = label_counts.indptr[i], label_counts.indptr[i + 1]
+                counts, indices = _mergePlurals(label_counts.data[start:end], terms, label_counts.indices[start:end])
+                table = topFrequencies(counts, terms, max_words, indices=indices)
+                listFrequencies.append(dict(zip(table['words'], table['count'])))
+            return uniques, listFrequencies
+
+        uniques, listFrequencies = self.__memo(
+            ('wordcloudsByLabel', _stopwordsKey(stopwords), max_words, self.__labelsKey(labels)), compute)
+        paths = None
+        if out_dir is not None:
+            os.makedirs(out_dir, exist_ok=True)
+            paths = [os.path.join(out_dir, "%s.png" % _fileName(i, label)) for i, label in enumerate(uniques)]
+        images = wordcloudImages(listFrequencies, max_font_size=max_font_size, max_words=max_words,
+                                 background_color=background_color, paths=paths, n_jobs=n_jobs)
+        return dict(zip(uniques, images))
+
+    @instrumented
     def vennWordcloudPlot(self, labels, stopwords=None):
         """
         Generate Venn Word cloud figure.
@@ -278,12 +952,64 @@ class Corpus:
         ----------
         labels : list of string
             Labels to be used in the venn groups. The list has to have 2 or 3 elements.
+            Only the first 3 labels are drawn.
 
         stopwords : list of strings, default=None
             That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+        Returns
+        -------
+        matplotlib.figure.Figure
         """
-        return vennWordcloudPlot(self.listText, self.listLabels, labels, stopwords)
+        if len(labels) < 2:
+            raise BaseException('Insuficient Numbers of labels. You need to give 2 or 3 labels.')
+        labels = list(labels[:3])
+        terms, membership = self.vennMembership(labels, stopwords)
+        return drawVennWordcloud(terms, membership, labels, stopwords)
+
+    @instrumented
+    def vennMembership(self, labels, stopwords=None, n_jobs=None):
+        """
+        Find which labels use each word.
+
+        The vocabulary of each label is read from the cached label-term counts of the corpus,
+        so the texts are not tokenized again. Any number of labels is supported.
+        Use vennRegions to split the words in the regions of a Venn diagram.
 
+        Parameters
+        ----------
+        labels : list of string
+            Labels of the groups.
+
+        stopwords : list of strings, default=None
+            That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+        Returns
+        -------
+        tuple (numpy array of strings, numpy array of bool)
+            The words used by at least one label, sorted alphabetically, and the matrix of shape
+            (number of words, number of labels) telling whether each label uses each word.
+        """
+        labels = list(labels)
+
+        def compute():
+            uniques, label_counts, terms = self.__labelCounts(stopwords, labels=labels, n_jobs=n_jobs)
+            positions = {label: i for i, label in enumerate(uniques)}
+            membership = np.zeros((len(terms), len(labels)), dtype=bool)
+            for j, label in enumerate(labels):
+                if label in positions:
+                    i = positions[label]
+                    membership[label_counts.indices[label_counts.indptr[i]:label_counts.indptr[i + 1]], j] = True
+            used = membership.any(axis=1)
+            return terms[used], membership[used]
+
+        # the order of the labels is the order of the columns
+        return self.__memo(('vennMembership', tuple(labels), _stopwordsKey(stopwords)), compute)
+
+    @instrumented
     def wordTree(self, keyword, maxNr=5):
         """
         Generate a word tree diagram.
@@ -302,9 +1028,39 @@ class Corpus:
         -------
         graphviz.graphs.Digraph
         """
-        return wordTree(self.listText, keyword, maxNr)
+        return drawWordTree(keyword, self.wordTreeNgrams(keyword, maxNr))
 
-    def bubbleChart(self, number_of_words=20, stopwords=None, palette='blue', title=None, labels=None):
+    @instrumented
+    def wordTreeNgrams(self, keyword, maxNr=5, n_jobs=None):
+        """
+        Count the n-grams that start or end with a keyword.
+
+        The n-grams are read around the occurrences of the keyword in the positional index
+        of the corpus, shared with phraseNetGraph, so a query does not read the whole corpus.
+        The result of each keyword and maxNr is kept in the result cache.
+
+        Parameters
+        ----------
+        keyword : string
+            The word to be the source of the tree. It is matched in lowercase.
+
+        maxNr : integer
+            Maximum number of tokens of an n-gram.
+
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts when the index is built.
+            None means 1 and -1 means all processors.
+
+        Returns
+        -------
+        collections.Counter
+            The count of each n-gram, a tuple of tokens.
+        """
+        return self.__memo(('wordTreeNgrams', keyword.lower(), maxNr),
+                           lambda: self.__phraseIndexOf(n_jobs).keywordNgrams(keyword, maxNr))
+
+    @instrumented
+    def bubbleChart(self, number_of_words=20, stopwords=None, palette='blue', title=None, labels=None, n_jobs=None):
         """
         Plot a bubble chart.
 
@@ -328,19 +1084,22 @@ class Corpus:
 
         labels : str or list of str, default=None
             Labels to be used to filter the text.
-        """
-        if labels is None:
-            return bubbleChart(self.listText, number_of_words=number_of_words, stopwords=stopwords, palette=palette, title=title)
 
-        else:
-            df = self.__mountDataframe(labels=labels)
-            return bubbleChart(df.text.tolist(), number_of_words=number_of_words, stopwords=stopwords, palette=palette, title=title)
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
 
-    def lexicalDispersionPlot(self, targetWords, labels=None):
+        Returns
+        -------
+        matplotlib.figure.Figure
         """
-        Make a lexical dispersion plot.
+        table = self.frequencyTable(
+            number_of_words, stopwords, labels=labels, n_jobs=n_jobs)
+        return drawBubbleChart(table, palette, title)
 
-        It uses the package yellowbrick under the hood.
+    @instrumented
+    def lexicalDispersionPlot(self, targetWords, labels=None, bins=None, n_jobs=None):
+        """
+        Make a lexical dispersion plot.
 
         Parameters
         ----------
@@ -349,19 +1108,56 @@ class Corpus:
 
         labels : str or list of str, default=None
             Labels to be used to filter the text.
+
+        bins : int, default=None
+            Number of bins of the word offsets. If None, one marker is drawn per occurrence,
+            otherwise the number of occurrences of each bin is drawn as a heat map.
+
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+        Returns
+        -------
+        matplotlib.figure.Figure
         """
-        if labels is None:
-            return lexicalDispersionPlot(self.listText, targetWords=targetWords)
+        offsets, total_words = self.dispersionOffsets(targetWords, labels, n_jobs)
+        return drawLexicalDispersion(offsets, total_words, bins)
 
-        else:
-            df = self.__mountDataframe(labels=labels)
-            return lexicalDispersionPlot(df.text.tolist(), targetWords=targetWords)
+    @instrumented
+    def dispersionOffsets(self, targetWords, labels=None, n_jobs=None):
+        """
+        Find the offsets of the occurrences of some words.
+
+        The offsets are read from the positional index of the corpus, built on the first
+        call and shared with phraseNetGraph, so each query only touches the occurrences
+        of the given words.
+
+        Parameters
+        ----------
+        targetWords : list of strings
+            The words to be found. They are matched in lowercase.
+
+        labels : str or list of str, default=None
+            Labels to be used to filter the text.
+
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
 
-    def wordCorrelationsPlot(self, words, labels=None):
+        Returns
+        -------
+        tuple (dict, int)
+            The sorted numpy array of int64 offsets of each word and the total number of tokens.
         """
-        Make a correlation plot.
+        def compute():
+            rows = None if labels is None else self.__rows(labels)
+            return self.__phraseIndexOf(n_jobs).offsets(targetWords, rows)
 
-        It uses the package yellowbrick under the hood.
+        return self.__memo(('dispersionOffsets', tuple(targetWords), self.__labelsKey(labels)), compute)
+
+    @instrumented
+    def wordCorrelationsPlot(self, words, labels=None, plotly=False, n_jobs=None):
+        """
+        Make a correlation plot.
 
         Parameters
         ----------
@@ -370,15 +1166,105 @@ class Corpus:
 
         labels : str or list of str, default=None
             Labels to be used to filter the text.
+
+        plotly : bolean
+            Flag to indicate the use of the plotly package.
+            Default = False
+
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+        Returns
+        -------
+        matplotlib.figure.Figure
+        if plotly is true, it returns plotly.graph_objs._figure.Figure
         """
-        if labels is None:
-            return wordCorrelationsPlot(self.listText, words=words)
+        correlations = self.wordCorrelations(words, labels, n_jobs)
+        if plotly:
+            return drawWordCorrelationsPlotly(correlations)
+        return drawWordCorrelations(correlations)
 
-        else:
-            df = self.__mountDataframe(labels=labels)
-            return wordCorrelationsPlot(df.text.tolist(), words=words)
+    @instrumented
+    def wordCorrelations(self, words, labels=None, n_jobs=None):
+        """
+        Compute the correlation between the presence of some words in the texts.
+
+        Single words are read from the columns of the cached document-term matrix of the corpus,
+        so the texts are not tokenized again. Phrases of several words are counted in a
+        matrix restricted to the given words, which is not kept: only the correlations are
+        kept, in the result cache.
+
+        Parameters
+        ----------
+        words : list of strings
+            The words to be correlated. A word can be a phrase of several words, like "new york".
+            The words are matched in lowercase.
+
+        labels : str or list of str, default=None
+            Labels to be used to filter the text.
+
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+        Returns
+        -------
+        pandas DataFrame with the phi coefficient of each pair of words, the words sorted alphabetically.
+        """
+        words = _correlationTerms(words)
+
+        def compute():
+            ngrams = [len(word.split()) for word in words]
+            if max(ngrams) > 1:
+                bag_of_words, terms = self.__vectorize(ngramRange=(min(ngrams), max(ngrams)), vocabulary=words,
+                                                       labels=labels, n_jobs=n_jobs)
+                return _phiCorrelations(bag_of_words, terms)
+
+            bag_of_words, terms = self.__documentTermMatrix(labels=labels, n_jobs=n_jobs)
+            columns = np.minimum(np.searchsorted(terms, words), len(terms) - 1)
+            for word, column in zip(words, columns):
+                if len(terms) == 0 or terms[column] != word:
+                    raise BaseException("Word '{}' does not exist in the corpus.".format(word))
+            return _phiCorrelations(bag_of_words[:, columns], words)
+
+        return self.__memo(('wordCorrelations', tuple(words), self.__labelsKey(labels)), compute)
+
+    @instrumented
+    def bigramCounts(self, stopwords=None, labels=None, total_bigrams=15, n_jobs=None):
+        """
+        Count the bigrams of the texts and keep the most frequent ones.
+
+        Parameters
+        ----------
+        stopwords : list of strings, default=None
+            That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+        labels : str or list of str, default=None
+            Labels to be used to filter the text.
+
+        total_bigrams : integer
+            The number of bigrams to be kept.
 
-    def bigramGraph(self, stopwords=None,  labels=None, total_bigrams=15):
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+        Returns
+        -------
+        pandas DataFrame with the columns bigram and count.
+        """
+        def compute():
+            if self.__internTokens:
+                rows = None if labels is None else self.__rows(labels)
+                return _topBigrams(*self.__tokenStoreOf().bigramCounts(stopwords, rows), total_bigrams)
+            return _bigramTable(self.__texts(labels), stopwords, total_bigrams, n_jobs)
+
+        return self.__memo(
+            ('bigramCounts', _stopwordsKey(stopwords), total_bigrams, self.__labelsKey(labels)),
+            lambda: self.__statistics(
+                ('bigramCounts', _stopwordsKey(stopwords), total_bigrams, labels),
+                compute, _encodeBigrams, _decodeBigrams))
+
+    @instrumented
+    def bigramGraph(self, stopwords=None,  labels=None, total_bigrams=15, n_jobs=None):
         """
         Make a graph of bigrams.
 
@@ -394,15 +1280,18 @@ class Corpus:
 
         total_bigrams : integer
             The number of bigrams that will appear on the graph.
-        """
-        if labels is None:
-            return bigramGraph(self.listText, stopwords=stopwords, total_bigrams=total_bigrams)
 
-        else:
-            df = self.__mountDataframe(labels=labels)
-            return bigramGraph(df.text.tolist(), stopwords=stopwords, total_bigrams=total_bigrams)
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+        Returns
+        -------
+        matplotlib.figure.Figure
+        """
+        return drawBigramGraph(self.bigramCounts(stopwords, labels, total_bigrams, n_jobs))
 
-    def frequencyDonutChart(self, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None, labels=None):
+    @instrumented
+    def frequencyDonutChart(self, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None, labels=None, n_jobs=None):
         """
         This function takes a text as input and plots a donut chart with the word frequencies using Plotly.
 
@@ -434,13 +1323,240 @@ class Corpus:
         labels : str or list of str, default=None
             Labels to be used to filter the text.
 
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
         Returns
         -------
             plotly.graph_objs._figure.Figure
         """
-        if labels is None:
-            return frequencyDonutChart(self.listText, number_of_words=number_of_words, stopwords=stopwords, ngramRange=ngramRange, vocabulary=vocabulary)
+        table = self.frequencyTable(
+            number_of_words, stopwords, ngramRange, vocabulary, labels, n_jobs)
+        return drawFrequencyDonutChart(table)
 
-        else:
-            df = self.__mountDataframe(labels=labels)
-            return frequencyDonutChart(df.text.tolist(), number_of_words=number_of_words, stopwords=stopwords, ngramRange=ngramRange, vocabulary=vocabulary)
+    @instrumented
+    def frequencyByLabel(self, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None, labels=None, plotly=False, n_jobs=None):
+        """
+        Count the most frequent tokens of every label at once.
+
+        The term counts of all labels are computed in a single sparse product between
+        a label-indicator matrix and the document-term matrix of the corpus.
+
+        Parameters
+        ----------
+        number_of_words : int
+            Number of words to be kept for each label.
+
+        stopwords : list of strings, default=None
+            That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+        ngramRange : tuple (min_n, max_n), default=(1, 1)
+            The lower and upper boundary of the range of n-values for different
+            word n-grams to be extracted.
+
+        vocabulary : Mapping or iterable, default=None
+            Either a Mapping (e.g., a dict) where keys are terms and values are
+            indices in the feature matrix, or an iterable over terms.
+
+        labels : str or list of str, default=None
+            Labels to be counted. If None, all labels of the corpus are used.
+
+        plotly : bolean
+            Flag to return a plotly figure with one bar chart per label.
+            Default = False
+
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+        Returns
+        -------
+        pandas DataFrame with the columns label, words and count.
+        if plotly is true, it returns plotly.graph_objs._figure.Figure
+        """
+        import pandas as pd
+
+        def compute():
+            uniques, label_counts, terms = self.__labelCounts(stopwords, ngramRange, vocabulary, labels, n_jobs)
+            frames = []
+            for i, label in enumerate(uniques):
+                start, end = label_counts.indptr[i], label_counts.indptr[i + 1]
+                frame = topFrequencies(label_counts.data[start:end], terms, number_of_words,
+                                       indices=label_counts.indices[start:end])
+                frame.insert(0, 'label', label)
+                frames.append(frame)
+            return pd.concat(frames, ignore_index=True) if frames else \
+                pd.DataFrame({'label': [], 'words': [], 'count': []})
+
+        table = self.__memo(('frequencyByLabel', number_of_words, self.__cacheKey(stopwords, ngramRange, vocabulary),
+                             self.__labelsKey(labels)), compute)
+        if plotly:
+            return drawFrequencyByLabel(table)
+        return table
+
+    @instrumented
+    def renderBatch(self, specs, out_dir=None, fmt='png', n_jobs=None):
+        """
+        Render many charts of the corpus to image files or bytes.
+
+        Every chart is drawn on its own figure, so nothing is shown and no pyplot
+        state is kept between charts.
+
+        Parameters
+        ----------
+        specs : list of dict
+            One dict per chart with the key 'method', the name of a chart method of the
+            corpus (e.g. 'bubbleChart'), and optionally 'kwargs', the dict of arguments
+            of the method, and 'name', the file name without extension. The chart methods
+            are frequencyPlot, frequencyTreeMap, frequencyDonutChart, bubbleChart, wordcloudPlot,
+            vennWordcloudPlot, phraseNet, bigramGraph, lexicalDispersionPlot, wordCorrelationsPlot
+            and wordTree.
+
+        out_dir : str, default=None
+            Directory where the images are written. If None, the images are returned as bytes.
+
+        fmt : str, default='png'
+            The output format, 'png' or 'svg'. Plotly charts need the kaleido package
+            and the word tree needs the graphviz binaries.
+
+        n_jobs : int, default=None
+            Number of processes rendering charts at the same time. None means 1 and -1 means all processors.
+            On platforms that do not fork, the corpus is pickled to each process.
+
+        Returns
+        -------
+        list of str with the paths of the written files, in the order of specs.
+        if out_dir is None, list of bytes with the rendered images.
+        """
+        if fmt not in ('png', 'svg'):
+            raise BaseException("Invalid format. Please choose png or svg.")
+        tasks = []
+        for i, spec in enumerate(specs):
+            method = spec.get('method')
+            if method not in _CHART_METHODS:
+                raise BaseException("Invalid chart method: %s" % method)
+            path = None
+            if out_dir is not None:
+                path = os.path.join(out_dir, "%s.%s" % (spec.get('name', "%d_%s" % (i, method)), fmt))
+            tasks.append((method, spec.get('kwargs', {}), fmt, path))
+        if out_dir is not None:
+            os.makedirs(out_dir, exist_ok=True)
+
+        n_jobs = _effectiveJobs(n_jobs)
+        if n_jobs == 1 or len(tasks) < 2:
+            return [_renderChart(self, *task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks)), initializer=_initRenderWorker,
+                                 initargs=(self,)) as executor:
+            return list(executor.map(_renderChartInWorker, tasks,
+                                     chunksize=max(1, len(tasks) // (4 * n_jobs))))
+
+
+# methods of Corpus that return a figure, the only ones renderBatch accepts
+_CHART_METHODS = ('frequencyPlot', 'frequencyTreeMap', 'frequencyDonutChart', 'bubbleChart', 'wordcloudPlot',
+                  'vennWordcloudPlot', 'phraseNet', 'bigramGraph', 'lexicalDispersionPlot', 'wordCorrelationsPlot',
+                  'wordTree')
+
+# corpus of a renderBatch worker process, set once by the pool initializer
+_workerCorpus = None
+
+
+def _initRenderWorker(corpus):
+    global _workerCorpus
+    _workerCorpus = corpus
+
+
+def _renderChartInWorker(task):
+    return _renderChart(_workerCorpus, *task)
+
+
+def _fileName(position, label):
+    """
+    Name of the file of a label that stays in its folder, with the position of the label first,
+    so labels that only differ in case or in replaced characters get different files.
+    """
+    return "%d_%s" % (position, re.sub(r"[^\w\-]", "_", str(label))[:100])
+
+
+def _renderChart(corpus, method, kwargs, fmt, path):
+    image = figureBytes(getattr(corpus, method)(**kwargs), fmt)
+    if path is None:
+        return image
+    with open(path, 'wb') as file:
+        file.write(image)
+    return path
+
+
+class CorpusView:
+    """
+    Class CorpusView to expose a subset of the texts of a Corpus.
+
+    It keeps only the positions of the texts and reads them from the corpus when needed,
+    so no string is copied.
+    Attributes
+    ----------
+        corpus : Corpus
+            The corpus that owns the texts.
+        rows : numpy array of int
+            Positions of the texts of the view in corpus.listText.
+    """
+
+    def __init__(self, corpus, rows):
+        """
+        Constructor of the class CorpusView
+        Parameters
+        ----------
+        corpus : Corpus
+            The corpus that owns the texts.
+        rows : numpy array of int
+            Positions of the texts of the view in corpus.listText.
+        """
+        self.corpus = corpus
+        self.rows = rows
+
+    def __repr__(self):
+        return "{self.__class__.__name__}()".format(self=self)
+
+    def __str__(self):
+        return "Object of class {self.__class__.__name__}".format(self=self)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        listText = self.corpus.listText
+        return (listText[i] for i in self.rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return CorpusView(self.corpus, self.rows[i])
+        return self.corpus.listText[self.rows[i]]
+
+
+class _TrackedList(list):
+    """
+    List that counts the changes made to it, so the corpus knows when its caches are outdated.
+    """
+
+    # number of changes, also the default while a pickled list is filled again
+    version = 0
+
+    def copy(self):
+        copy = _TrackedList(self)
+        copy.version = self.version
+        return copy
+
+
+def _tracked(name):
+    method = getattr(list, name)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.version += 1
+        return result
+
+    return wrapper
+
+
+for _name in ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend', 'insert',
+              'pop', 'remove', 'clear', 'sort', 'reverse'):
+    setattr(_TrackedList, _name, _tracked(_name))
@@ -1,15 +1,18 @@
 """
 Module to make a correlation plot.
 """
-from yellowbrick.text.correlation import WordCorrelationPlot
+import numpy as np
+from ..counting.counting import documentTermMatrix
+from ..textvisualizer import _newFigure
+from ..instrument.instrument import instrumented
 
 
+@instrumented
 def wordCorrelationsPlot(listText, words):
     """
     Make a correlation plot.
 
     It receives a list of text and a list of words and make a correlation plot.
-    It uses the package yellowbrick under the hood.
 
     Parameters
     ----------
@@ -19,8 +22,150 @@ def wordCorrelationsPlot(listText, words):
     words : list of strings
         The list of words to be used to plot the figure.
 
+    Returns
+    -------
+    matplotlib.figure.Figure
     """
-    # Instantiate the visualizer and draw the plot
-    viz = WordCorrelationPlot(words)
-    viz.fit(listText)
-    viz.show()
+    return drawWordCorrelations(wordCorrelations(listText, words))
+
+
+@instrumented
+def wordCorrelations(listText, words, n_jobs=None):
+    """
+    Compute the correlation between the presence of some words in the texts.
+
+    Only the columns of the given words are counted, and the coefficients of all pairs
+    come from a single sparse product, so hundreds of words can be correlated at once.
+
+    Parameters
+    ----------
+    listText : list of strings
+        The corpus of text.
+
+    words : list of strings
+        The words to be correlated. A word can be a phrase of several words, like "new york".
+        The words are matched in lowercase.
+
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+    Returns
+    -------
+    pandas DataFrame with the phi coefficient of each pair of words, the words sorted alphabetically.
+    """
+    words = _correlationTerms(words)
+    ngrams = [len(word.split()) for word in words]
+    bag_of_words, terms = documentTermMatrix(listText, ngramRange=(min(ngrams), max(ngrams)),
+                                             vocabulary=words, n_jobs=n_jobs)
+    return _phiCorrelations(bag_of_words, terms)
+
+
+def _correlationTerms(words):
+    """
+    Strip, lowercase, sort and deduplicate the words to be correlated.
+    """
+    terms = sorted(set(word.strip().lower() for word in words if len(word.strip()) > 0))
+    if len(terms) == 0:
+        raise BaseException("Must provide at least one word to plot.")
+    return terms
+
+
+@instrumented
+def _phiCorrelations(bag_of_words, terms):
+    """
+    Phi coefficients between the columns of a document-term matrix.
+
+    For binary columns m and n of N documents, phi is
+    (N * both - total_m * total_n) / sqrt(total_m * total_n * (N - total_m) * (N - total_n)).
+    """
+    import pandas as pd
+
+    presence = bag_of_words.tocsc(copy=True)
+    presence.data[:] = 1
+    totals = np.asarray(presence.sum(axis=0), dtype=np.float64).ravel()
+    for term, total in zip(terms, totals):
+        if total == 0:
+            raise BaseException("Word '{}' does not exist in the corpus.".format(term))
+    both = (presence.T @ presence).toarray().astype(np.float64)
+    num_docs = presence.shape[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlations = (num_docs * both - np.outer(totals, totals)) / \
+            np.sqrt(np.outer(totals * (num_docs - totals), totals * (num_docs - totals)))
+    return pd.DataFrame(correlations, index=list(terms), columns=list(terms))
+
+
+@instrumented
+def drawWordCorrelations(correlations, fontsize=None):
+    """
+    Draw the heat map of a word correlation matrix.
+
+    The coefficients are written in the cells when there are at most 20 words.
+
+    Parameters
+    ----------
+    correlations : pandas DataFrame
+        The correlation of each pair of words, as returned by wordCorrelations.
+
+    fontsize : int, default=None
+        Font size of the tick labels and of the coefficients.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+    """
+    from yellowbrick.style.palettes import color_sequence
+    from yellowbrick.style import find_text_color
+
+    words = list(correlations.columns)
+    size = len(words)
+    cmap = color_sequence("RdYlBu")
+    # the first word is at the top
+    values = np.flipud(correlations.to_numpy())
+
+    fig, ax = _newFigure()
+    ax.set_ylim(bottom=0, top=size)
+    ax.set_xlim(left=0, right=size)
+    ticks = np.arange(size) + 0.5
+    ax.set(xticks=ticks, yticks=ticks)
+    ax.set_xticklabels(words, rotation="vertical", fontsize=fontsize)
+    ax.set_yticklabels(words[::-1], fontsize=fontsize)
+
+    if size <= 20:
+        for row in range(size):
+            for column in range(size):
+                value = values[row, column]
+                text_color = find_text_color(cmap(value / 2 + 0.5))
+                ax.text(column + 0.5, row + 0.5, "{:.2f}".format(value), va="center", ha="center",
+                        color=text_color, fontsize=fontsize)
+
+    mesh = ax.pcolormesh(np.arange(size + 1), np.arange(size + 1), values, cmap=cmap, vmin=-1, vmax=1)
+    fig.colorbar(mesh, ax=ax)
+    ax.set_title("Word Correlation Plot")
+    fig.tight_layout()
+    return fig
+
+
+@instrumented
+def drawWordCorrelationsPlotly(correlations):
+    """
+    Draw the heat map of a word correlation matrix with plotly express.
+
+    Parameters
+    ----------
+    correlations : pandas DataFrame
+        The correlation of each pair of words, as returned by wordCorrelations.
+
+    Returns
+    -------
+    plotly.graph_objs._figure.Figure
+    """
+    import plotly.express as px
+
+    fig = px.imshow(correlations,
+                    zmin=-1,
+                    zmax=1,
+                    color_continuous_scale='RdYlBu',
+                    text_auto='.2f' if len(correlations) <= 20 else False,
+                    title='Word Correlation Plot'
+                    )
+    return fig
@@ -0,0 +1,3 @@
+"""
+Module for chunked term counting
+"""
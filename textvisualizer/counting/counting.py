@@ -0,0 +1,503 @@
+"""
+Module for chunked term counting
+"""
+
+import os
+import re
+import numpy as np
+from array import array
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from ..instrument.instrument import instrumented
+
+# same rule as the default token_pattern of the document-term matrix
+_TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def tokenize(text):
+    """
+    Split a text in lowercase tokens.
+
+    A token is a word of two or more alphanumeric characters, the rule used by
+    documentTermMatrix, so the engines that scan token streams agree with the term counts.
+
+    Parameters
+    ----------
+    text : str
+
+    Returns
+    -------
+    list of strings
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+@instrumented
+def documentTermMatrix(listText, stopwords=None, ngramRange=(1, 1), vocabulary=None, n_jobs=None):
+    """
+    Build the sparse document-term matrix of a list of texts.
+
+    The texts are tokenized and counted in a single pass, so the result can be
+    shared by every frequency based visualization.
+
+    Parameters
+    ----------
+    listText : list of strings
+
+    stopwords : list of strings, default=None
+        That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+    ngramRange : tuple (min_n, max_n), default=(1, 1)
+        The lower and upper boundary of the range of n-values for different
+        word n-grams to be extracted.
+
+    vocabulary : Mapping or iterable, default=None
+        Either a Mapping (e.g., a dict) where keys are terms and values are
+        indices in the feature matrix, or an iterable over terms. If not
+        given, a vocabulary is determined from the input documents.
+
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+        The texts are split in contiguous shards whose matrices are merged, so the result is
+        identical to the serial one.
+
+    Returns
+    -------
+    tuple (scipy.sparse.csr_matrix, numpy.ndarray)
+        The document-term matrix and the terms of its columns.
+    """
+    import scipy.sparse as sp
+
+    n_jobs = _effectiveJobs(n_jobs)
+    if n_jobs == 1:
+        return _vectorize(listText, stopwords, ngramRange, vocabulary)
+
+    shards = [(shard, stopwords, ngramRange, vocabulary)
+              for shard in _split(listText, n_jobs)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        partials = list(executor.map(_vectorizeShard, shards))
+
+    if vocabulary is not None:
+        # every shard already has the columns of the given vocabulary
+        return sp.vstack([matrix for matrix, terms in partials], format='csr'), partials[0][1]
+
+    terms = np.unique(np.concatenate(
+        [np.asarray(terms, dtype=object) for matrix, terms in partials]))
+    if len(terms) == 0:
+        raise ValueError(
+            "empty vocabulary; perhaps the documents only contain stop words")
+    blocks = []
+    for matrix, shard_terms in partials:
+        columns = np.searchsorted(terms, shard_terms)
+        blocks.append(sp.csr_matrix((matrix.data, columns[matrix.indices], matrix.indptr),
+                                    shape=(matrix.shape[0], len(terms))))
+    bag_of_words = sp.vstack(blocks, format='csr')
+    bag_of_words.sort_indices()
+    return bag_of_words, terms
+
+
+def _vectorize(listText, stopwords, ngramRange, vocabulary):
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    count_vect = CountVectorizer(
+        analyzer='word',
+        stop_words=stopwords,
+        ngram_range=ngramRange,
+        vocabulary=vocabulary
+    )
+    bag_of_words = count_vect.fit_transform(listText)
+    return bag_of_words, count_vect.get_feature_names_out()
+
+
+def _vectorizeShard(args):
+    import scipy.sparse as sp
+
+    listText, stopwords, ngramRange, vocabulary = args
+    try:
+        return _vectorize(listText, stopwords, ngramRange, vocabulary)
+    except ValueError as err:
+        # a shard made only of stop words has no vocabulary
+        if 'empty vocabulary' not in str(err):
+            raise
+        return sp.csr_matrix((len(listText), 0), dtype=np.int64), np.array([], dtype=object)
+
+
+def _countShard(args):
+    bag_of_words, terms = _vectorizeShard(args)
+    return np.asarray(bag_of_words.sum(axis=0)).ravel(), terms
+
+
+def _split(listText, n_jobs):
+    """
+    Split a list of texts in at most n_jobs contiguous and non-empty shards.
+    """
+    listText = list(listText)
+    bounds = np.linspace(0, len(listText), n_jobs + 1).astype(int)
+    return [listText[start:end] for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _effectiveJobs(n_jobs):
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+def batches(documents, batch_size=10000):
+    """
+    Split an iterable of documents in lists of at most batch_size documents.
+
+    Parameters
+    ----------
+    documents : iterable of strings
+
+    batch_size : int
+        Maximum number of documents of each batch.
+    """
+    iterator = iter(documents)
+    batch = list(islice(iterator, batch_size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, batch_size))
+
+
+def mergeCounts(partials):
+    """
+    Merge partial term counts by vocabulary union and count sum.
+
+    Parameters
+    ----------
+    partials : iterable of tuples (counts, terms)
+        Counts of each term of a partial vocabulary.
+
+    Returns
+    -------
+    tuple (numpy array of int, numpy array of strings)
+        The summed counts and the merged vocabulary, sorted alphabetically.
+    """
+    partials = list(partials)
+    if not partials:
+        return np.array([], dtype=np.int64), np.array([], dtype=object)
+    terms, inverse = np.unique(np.concatenate([np.asarray(terms, dtype=object) for counts, terms in partials]),
+                               return_inverse=True)
+    counts = np.zeros(len(terms), dtype=np.int64)
+    np.add.at(counts, inverse, np.concatenate([counts for counts, terms in partials]))
+    return counts, terms
+
+
+@instrumented
+def countTerms(documents, stopwords=None, ngramRange=(1, 1), vocabulary=None, batch_size=10000, n_jobs=None):
+    """
+    Count the terms of an iterable of documents, one batch at a time.
+
+    Only a few batches of documents and their document-term matrices are in memory at once,
+    so the peak memory is bounded by the batch size plus the vocabulary.
+    As documentTermMatrix, it raises a ValueError when no term is found in the documents,
+    for example when they only contain stop words.
+
+    Parameters
+    ----------
+    documents : iterable of strings
+        The documents to be counted. It can be a generator or a file object.
+
+    stopwords : list of strings, default=None
+        That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+    ngramRange : tuple (min_n, max_n), default=(1, 1)
+        The lower and upper boundary of the range of n-values for different
+        word n-grams to be extracted.
+
+    vocabulary : Mapping or iterable, default=None
+        Either a Mapping (e.g., a dict) where keys are terms and values are
+        indices in the feature matrix, or an iterable over terms. If not
+        given, a vocabulary is determined from the input documents.
+
+    batch_size : int
+        Number of documents vectorized at once.
+
+    n_jobs : int, default=None
+        Number of processes counting batches at the same time. None means 1 and -1 means all processors.
+
+    Returns
+    -------
+    tuple (numpy array of int, numpy array of strings)
+        The count of each term and the vocabulary, sorted alphabetically.
+    """
+    index = {}
+    counts = np.zeros(0, dtype=np.int64)
+
+    def accumulate(batch_counts, terms):
+        nonlocal counts
+        ids = np.fromiter((index.setdefault(term, len(index)) for term in terms),
+                          dtype=np.intp, count=len(terms))
+        if len(index) > len(counts):
+            counts = np.concatenate(
+                [counts, np.zeros(max(len(index) - len(counts), len(counts)), dtype=np.int64)])
+        counts[ids] += batch_counts
+
+    tasks = ((batch, stopwords, ngramRange, vocabulary)
+             for batch in batches(documents, batch_size))
+    n_jobs = _effectiveJobs(n_jobs)
+    if n_jobs == 1:
+        for task in tasks:
+            accumulate(*_countShard(task))
+    else:
+        # keep a bounded number of batches in flight
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            pending = deque()
+            for task in tasks:
+                pending.append(executor.submit(_countShard, task))
+                if len(pending) >= 2 * n_jobs:
+                    accumulate(*pending.popleft().result())
+            while pending:
+                accumulate(*pending.popleft().result())
+
+    if not index and vocabulary is None:
+        raise ValueError(
+            "empty vocabulary; perhaps the documents only contain stop words")
+    terms = np.array(list(index), dtype=object)
+    order = np.argsort(terms, kind='stable')
+    return counts[:len(index)][order], terms[order]
+
+
+def _internTexts(listText):
+    """
+    Encode the tokens of a list of texts as ids of a local vocabulary, with the number of tokens of each text.
+    """
+    vocabulary = {}
+    # typed buffers take 4 bytes per token, instead of a Python int in a list
+    ids = array('I')
+    lengths = array('q')
+    for text in listText:
+        tokens = tokenize(text)
+        lengths.append(len(tokens))
+        ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+    return (np.array(list(vocabulary), dtype=object), np.frombuffer(ids, dtype=np.uintc),
+            np.frombuffer(lengths, dtype=np.int64))
+
+
+def _stopwordSet(stopwords):
+    """
+    Stop words as interpreted by the document-term matrix: a list, or the name of a built-in list.
+    """
+    if stopwords is None:
+        return frozenset()
+    if isinstance(stopwords, str):
+        if stopwords != 'english':
+            raise ValueError("not a built-in stop list: %s" % stopwords)
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+        return ENGLISH_STOP_WORDS
+    return frozenset(stopwords)
+
+
+def _vocabularyIndex(vocabulary):
+    """
+    Column of each term of a vocabulary, as read by the document-term matrix: a Mapping, or an iterable of terms.
+    """
+    if isinstance(vocabulary, Mapping):
+        index = dict(vocabulary)
+    else:
+        index = {}
+        for term in vocabulary:
+            if term in index:
+                raise ValueError("Duplicate term in vocabulary: %r" % term)
+            index[term] = len(index)
+    if not index:
+        raise ValueError("empty vocabulary passed to fit")
+    if sorted(index.values()) != list(range(len(index))):
+        raise ValueError("Vocabulary of size %d has repeated indices or gaps." % len(index))
+    return index
+
+
+class TokenStore:
+    """
+    Class TokenStore to keep the tokens of a list of texts as integers.
+
+    The texts are tokenized once, by the rule of documentTermMatrix, and each token is
+    replaced by its id in the vocabulary. The ids of all texts are kept in a single array
+    and the tokens of text i are ids[offsets[i]:offsets[i + 1]], as the rows of a CSR matrix,
+    so the word and n-gram counts and the bigrams are computed with numpy without reading the texts again.
+    Attributes
+    ----------
+        terms : numpy array of str
+            The vocabulary, sorted alphabetically.
+        ids : numpy array of uint32
+            Ids of the tokens of all texts, one text after the other.
+        offsets : numpy array of int64
+            Position in ids of the first token of each text, followed by the number of tokens.
+    """
+
+    @instrumented
+    def __init__(self, listText, n_jobs=None):
+        """
+        Constructor of the class TokenStore
+        Parameters
+        ----------
+        listText : list of str
+            The texts to be tokenized.
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+        """
+        n_jobs = _effectiveJobs(n_jobs)
+        if n_jobs == 1:
+            partials = [_internTexts(listText)]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                partials = list(executor.map(_internTexts, _split(listText, n_jobs)))
+
+        terms = np.unique(np.concatenate(
+            [np.array([], dtype=object)] + [shard_terms for shard_terms, ids, lengths in partials]))
+        # map the ids of each shard vocabulary to the merged one
+        blocks = [np.searchsorted(terms, shard_terms).astype(np.uint32)[ids] for shard_terms, ids, lengths in partials]
+        self.terms = terms
+        self.ids = blocks[0] if len(blocks) == 1 else np.concatenate([np.array([], dtype=np.uint32)] + blocks)
+        self.offsets = np.concatenate(
+            [[0]] + [lengths for shard_terms, ids, lengths in partials]).cumsum().astype(np.int64)
+
+    def __repr__(self):
+        return "{self.__class__.__name__}()".format(self=self)
+
+    def __str__(self):
+        return "Object of class {self.__class__.__name__}".format(self=self)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __termMask(self, words):
+        """
+        Private method to get the boolean mask of the terms that are in a set of words.
+        """
+        return np.isin(self.terms, np.array(list(words), dtype=object))
+
+    def __documents(self):
+        """
+        Private method to get the position of the text of each token.
+        """
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+
+    @instrumented
+    def documentTermMatrix(self, stopwords=None, ngramRange=(1, 1), vocabulary=None):
+        """
+        Build the document-term matrix of the texts.
+
+        For the words of the texts, the ids and offsets are already the column indices and
+        the row pointers of the matrix. The n-grams are read from windows of consecutive ids
+        of each text, after the removal of the stop words. It is the same matrix as
+        documentTermMatrix, built without tokenizing the texts.
+
+        Parameters
+        ----------
+        stopwords : list of strings, default=None
+            That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+        ngramRange : tuple (min_n, max_n), default=(1, 1)
+            The lower and upper boundary of the range of n-values for different
+            word n-grams to be extracted.
+
+        vocabulary : Mapping or iterable, default=None
+            Either a Mapping (e.g., a dict) where keys are terms and values are
+            indices in the feature matrix, or an iterable over terms. If not
+            given, a vocabulary is determined from the texts.
+
+        Returns
+        -------
+        tuple (scipy.sparse.csr_matrix, numpy.ndarray)
+            The document-term matrix and the terms of its columns.
+        """
+        import scipy.sparse as sp
+
+        stopwords = _stopwordSet(stopwords)
+        if tuple(ngramRange) != (1, 1) or vocabulary is not None:
+            return self.__ngramMatrix(stopwords, ngramRange, vocabulary)
+        bag_of_words = sp.csr_matrix((np.ones(len(self.ids), dtype=np.int64), self.ids, self.offsets),
+                                     shape=(len(self), len(self.terms)))
+        bag_of_words.sum_duplicates()
+        terms = self.terms
+        if stopwords:
+            keep = ~self.__termMask(stopwords)
+            bag_of_words, terms = bag_of_words[:, keep], terms[keep]
+        if len(terms) == 0:
+            raise ValueError(
+                "empty vocabulary; perhaps the documents only contain stop words")
+        return bag_of_words, terms
+
+    def __ngramMatrix(self, stopwords, ngramRange, vocabulary):
+        """
+        Private method to build the document-term matrix of the n-grams of the texts, or of a given vocabulary.
+        """
+        import scipy.sparse as sp
+
+        ids, documents = self.ids, self.__documents()
+        if stopwords:
+            keep = ~self.__termMask(stopwords)[ids]
+            ids, documents = ids[keep], documents[keep]
+        grams = []
+        rows = [np.array([], dtype=np.int64)]
+        columns = [np.array([], dtype=np.int64)]
+        for n in range(ngramRange[0], ngramRange[1] + 1):
+            if len(ids) < n:
+                continue
+            # windows of n tokens of the same text
+            starts = np.flatnonzero(documents[:len(ids) - n + 1] == documents[n - 1:])
+            windows = ids[starts[:, None] + np.arange(n)]
+            unique, inverse = np.unique(windows, axis=0, return_inverse=True)
+            rows.append(documents[starts])
+            columns.append(inverse.reshape(-1) + len(grams))
+            grams.extend(' '.join(words) for words in self.terms[unique])
+        grams = np.array(grams, dtype=object)
+        rows, columns = np.concatenate(rows), np.concatenate(columns)
+
+        if vocabulary is None:
+            terms, grams_columns = np.unique(grams, return_inverse=True)
+            if len(terms) == 0:
+                raise ValueError(
+                    "empty vocabulary; perhaps the documents only contain stop words")
+        else:
+            index = _vocabularyIndex(vocabulary)
+            terms = np.empty(len(index), dtype=object)
+            terms[list(index.values())] = list(index.keys())
+            grams_columns = np.fromiter((index.get(gram, -1) for gram in grams), dtype=np.int64, count=len(grams))
+        columns = grams_columns.reshape(-1)[columns]
+        found = columns >= 0
+        bag_of_words = sp.csr_matrix((np.ones(found.sum(), dtype=np.int64), (rows[found], columns[found])),
+                                     shape=(len(self), len(terms)))
+        bag_of_words.sort_indices()
+        return bag_of_words, terms
+
+    @instrumented
+    def bigramCounts(self, stopwords=None, rows=None):
+        """
+        Count the bigrams of the texts.
+
+        Stop words are removed before pairing, and no bigram spans two texts, as in bigramGraph.
+
+        Parameters
+        ----------
+        stopwords : list of strings, default=None
+            That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+        rows : array-like of int, default=None
+            Positions of the texts to be counted. If None, all texts are counted.
+
+        Returns
+        -------
+        tuple (numpy array of strings, numpy array of int, numpy array of int)
+            The vocabulary, the distinct bigrams as keys left * V + right, where V is the
+            size of the vocabulary, and their counts.
+        """
+        documents = self.__documents()
+        keep = np.ones(len(self.ids), dtype=bool)
+        stopwords = _stopwordSet(stopwords)
+        if stopwords:
+            keep &= ~self.__termMask(stopwords)[self.ids]
+        if rows is not None:
+            selected = np.zeros(len(self), dtype=bool)
+            selected[np.asarray(rows, dtype=np.intp)] = True
+            keep &= selected[documents]
+        ids, documents = self.ids[keep].astype(np.int64), documents[keep]
+        same = documents[:-1] == documents[1:]
+        keys, counts = np.unique(ids[:-1][same] * len(self.terms) + ids[1:][same], return_counts=True)
+        return self.terms, keys, counts
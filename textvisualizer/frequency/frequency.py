@@ -3,27 +3,137 @@ Module for frequency plot
 """
 
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-import plotly.express as px
-from sklearn.feature_extraction.text import CountVectorizer
-from yellowbrick.text import FreqDistVisualizer
-from collections import Counter
-
-
-def __countvectorize(listText, stopwords=None, ngramRange=(1, 1), vocabulary=None):
-    count_vect = CountVectorizer(
-        analyzer='word',
-        stop_words=stopwords,
-        ngram_range=ngramRange,
-        vocabulary=vocabulary
-    )
-    count_vect.fit(listText)
-    return count_vect
+from ..counting.counting import documentTermMatrix
+from ..textvisualizer import _newFigure
+from ..instrument.instrument import instrumented
+from ..cache.cache import textsFingerprint, _cachedStatistics, _stopwordsKey
+
+
+@instrumented
+def topFrequencies(counts, terms, number_of_words=20, indices=None):
+    """
+    Select the most frequent terms of a count vector.
+
+    Only the winning positions are sorted and mapped back to strings, so the cost
+    is linear in the size of the vocabulary. Ties are broken by the position of
+    the term, which keeps the result deterministic.
+
+    Parameters
+    ----------
+    counts : array-like of int
+        Count of each term. If indices is given, count of each term in indices.
+
+    terms : numpy array of strings
+        The terms of the vocabulary.
+
+    number_of_words : int
+        Number of terms to be kept.
+
+    indices : array-like of int, default=None
+        Positions in terms of the given counts, for sparse count vectors.
+
+    Returns
+    -------
+    pandas DataFrame with the columns words and count, sorted by decreasing count.
+    Terms with zero count are left out.
+    """
+    import pandas as pd
+
+    counts = np.asarray(counts).ravel()
+    if indices is None:
+        indices = np.flatnonzero(counts)
+        counts = counts[indices]
+    else:
+        indices = np.asarray(indices).ravel()
+        keep = counts > 0
+        indices, counts = indices[keep], counts[keep]
+
+    k = max(0, min(number_of_words, len(counts)))
+    if k == 0:
+        selected = np.array([], dtype=np.intp)
+    elif k < len(counts):
+        kth = np.partition(counts, len(counts) - k)[len(counts) - k]
+        above = np.flatnonzero(counts > kth)
+        tied = np.flatnonzero(counts == kth)
+        missing = k - len(above)
+        if missing < len(tied):
+            tied = tied[np.argpartition(indices[tied], missing - 1)[:missing]]
+        selected = np.concatenate([above, tied])
+    else:
+        selected = np.arange(len(counts))
+    selected = selected[np.lexsort((indices[selected], -counts[selected]))]
+    return pd.DataFrame({'words': np.asarray(terms)[indices[selected]],
+                         'count': counts[selected]})
+
+
+def _wordFrequencies(bag_of_words, terms, number_of_words):
+    """
+    Sum a document-term matrix over its rows and keep the most frequent terms.
+    """
+    sum_words = np.asarray(bag_of_words.sum(axis=0)).ravel()
+    return topFrequencies(sum_words, terms, number_of_words)
+
+
+@instrumented
+def frequencyTable(listText, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None, n_jobs=None):
+    """
+    Count the tokens of a list of texts and keep the most frequent ones.
+
+    It is the data behind frequencyPlot, frequencyPlotly, frequencyTreeMap, frequencyDonutChart
+    and bubbleChart, so it can be computed once and drawn many times.
+
+    Parameters
+    ----------
+    listText : list of strings
+
+    number_of_words : int
+        Number of words to be kept.
+
+    stopwords : list of strings, default=None
+        That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
 
+    ngramRange : tuple (min_n, max_n), default=(1, 1)
+        The lower and upper boundary of the range of n-values for different
+        word n-grams to be extracted.
+
+    vocabulary : Mapping or iterable, default=None
+        Either a Mapping (e.g., a dict) where keys are terms and values are
+        indices in the feature matrix, or an iterable over terms. If not
+        given, a vocabulary is determined from the input documents.
+
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+    Returns
+    -------
+    pandas DataFrame with the columns words and count, sorted by decreasing count.
 
-def frequencyPlot(listText, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None):
+    Notes
+    -----
+    When the statistics cache is on, the table is read from it if the same texts were
+    counted before with the same parameters. See configureStatisticsCache.
+    """
+    return _cachedStatistics(
+        lambda: ('frequencyTable', textsFingerprint(listText), number_of_words,
+                 _stopwordsKey(stopwords), tuple(ngramRange), vocabulary),
+        lambda: _wordFrequencies(*documentTermMatrix(listText, stopwords, ngramRange, vocabulary, n_jobs),
+                                 number_of_words),
+        _encodeTable, _decodeTable)
+
+
+def _encodeTable(table):
+    return {'words': np.array(table['words'].tolist(), dtype=str),
+            'count': table['count'].to_numpy(dtype=np.int64)}
+
+
+def _decodeTable(arrays):
+    import pandas as pd
+
+    return pd.DataFrame({'words': arrays['words'].astype(object), 'count': arrays['count']})
+
+
+@instrumented
+def frequencyPlot(listText, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None, n_jobs=None):
     """
     Plot a bar graph with the token frequencies.
 
@@ -55,29 +165,43 @@ def frequencyPlot(listText, number_of_words=20, stopwords=None, ngramRange=(1, 1
         given, a vocabulary is determined from the input documents. Indices
         in the mapping should not be repeated and should not have any gap
         between 0 and the largest index.
+
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+    """
+    return drawFrequencyPlot(frequencyTable(listText, number_of_words, stopwords, ngramRange, vocabulary, n_jobs))
+
+
+@instrumented
+def drawFrequencyPlot(table):
+    """
+    Draw the bar graph of a frequency table with matplotlib.
+
+    Parameters
+    ----------
+    table : pandas DataFrame
+        Table with the columns words and count, as returned by frequencyTable.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
     """
-    count_vect = __countvectorize(listText, stopwords, ngramRange, vocabulary)
-    bag_of_words = count_vect.transform(listText)
-    sum_words = bag_of_words.sum(axis=0)
-    word_freq = [(word, sum_words[0, idx])
-                 for word, idx in count_vect.vocabulary_.items()]
-    word_freq = sorted(word_freq, key=lambda x: x[1], reverse=True)
-    yPos = np.arange(number_of_words)
-    objects = []
-    performance = []
-    for i in range(number_of_words):
-        aux = word_freq[i]
-        objects.append(aux[0])
-        performance.append(aux[1])
-    plt.barh(yPos, performance, align='center', alpha=0.5)
-    plt.yticks(yPos, objects)
-    plt.xlabel('Frequency')
-    plt.ylabel('Tokens')
-    plt.title('Frequency of tokens')
-    plt.show()
-
-
-def frequencyPlotly(listText, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None):
+    fig, ax = _newFigure()
+    yPos = np.arange(len(table))
+    ax.barh(yPos, table['count'], align='center', alpha=0.5)
+    ax.set_yticks(yPos, table['words'])
+    ax.set_xlabel('Frequency')
+    ax.set_ylabel('Tokens')
+    ax.set_title('Frequency of tokens')
+    return fig
+
+
+@instrumented
+def frequencyPlotly(listText, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None, n_jobs=None):
     """
     Plot a bar graph with the token frequencies.
 
@@ -109,23 +233,33 @@ def frequencyPlotly(listText, number_of_words=20, stopwords=None, ngramRange=(1,
         in the mapping should not be repeated and should not have any gap
         between 0 and the largest index.
 
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+    Returns
+    -------
+    plotly.graph_objs._figure.Figure
+    """
+    return drawFrequencyPlotly(frequencyTable(listText, number_of_words, stopwords, ngramRange, vocabulary, n_jobs))
+
+
+@instrumented
+def drawFrequencyPlotly(table):
+    """
+    Draw the bar graph of a frequency table with plotly.
+
+    Parameters
+    ----------
+    table : pandas DataFrame
+        Table with the columns words and count, as returned by frequencyTable.
+
     Returns
     -------
     plotly.graph_objs._figure.Figure
     """
-    count_vect = __countvectorize(listText, stopwords, ngramRange, vocabulary)
-    bag_of_words = count_vect.transform(listText)
-    sum_words = bag_of_words.sum(axis=0)
-    word_freq = [(word, sum_words[0, idx])
-                 for word, idx in count_vect.vocabulary_.items()]
-    word_freq = sorted(word_freq, key=lambda x: x[1], reverse=True)
-    objects = []
-    performance = []
-    for i in range(number_of_words):
-        aux = word_freq[i]
-        objects.append(aux[0])
-        performance.append(aux[1])
-    data = [go.Bar(x=objects, y=performance,
+    import plotly.graph_objects as go
+
+    data = [go.Bar(x=table['words'].tolist(), y=table['count'].tolist(),
                    name='Frequency Plot', orientation='v')]
     layout = go.Layout(title="Frequencies", xaxis=dict(
         title="tokens"), yaxis=dict(title="quantity"))
@@ -133,7 +267,8 @@ def frequencyPlotly(listText, number_of_words=20, stopwords=None, ngramRange=(1,
     return fig
 
 
-def frequencyPlotYellowbrick(listText, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None):
+@instrumented
+def frequencyPlotYellowbrick(listText, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None, n_jobs=None):
     """
     Plot a bar graph with the token frequencies.
 
@@ -165,18 +300,33 @@ def frequencyPlotYellowbrick(listText, number_of_words=20, stopwords=None, ngram
         given, a vocabulary is determined from the input documents. Indices
         in the mapping should not be repeated and should not have any gap
         between 0 and the largest index.
+
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
     """
-    count_vect = __countvectorize(listText, stopwords, ngramRange, vocabulary)
-    docs = count_vect.transform(listText)
-    features = count_vect.get_feature_names_out()
+    docs, features = documentTermMatrix(
+        listText, stopwords, ngramRange, vocabulary, n_jobs)
+    return _drawFrequencyPlotYellowbrick(docs, features, number_of_words)
+
 
+@instrumented
+def _drawFrequencyPlotYellowbrick(docs, features, number_of_words):
+    from yellowbrick.text import FreqDistVisualizer
+
+    fig, ax = _newFigure()
     visualizer = FreqDistVisualizer(
-        features=features, orient='v', n=number_of_words)
+        features=features, orient='v', n=number_of_words, ax=ax, fig=fig)
     visualizer.fit(docs)
-    visualizer.show()
+    visualizer.finalize()
+    return fig
 
 
-def frequencyTreeMap(listText, number_of_words=100, stopwords=None, ngramRange=(1, 1), vocabulary=None):
+@instrumented
+def frequencyTreeMap(listText, number_of_words=100, stopwords=None, ngramRange=(1, 1), vocabulary=None, n_jobs=None):
     """
     Plot a tree map with the token frequencies.
 
@@ -209,36 +359,44 @@ def frequencyTreeMap(listText, number_of_words=100, stopwords=None, ngramRange=(
         in the mapping should not be repeated and should not have any gap
         between 0 and the largest index.
 
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
     Returns
     -------
         plotly.graph_objs._figure.Figure
     """
-    count_vect = __countvectorize(listText, stopwords, ngramRange, vocabulary)
-    count_vect.fit(listText)
-    bag_of_words = count_vect.transform(listText)
-    sum_words = bag_of_words.sum(axis=0)
-    word_freq = [(word, sum_words[0, idx])
-                 for word, idx in count_vect.vocabulary_.items()]
-    word_freq = sorted(word_freq, key=lambda x: x[1], reverse=True)
-    y_pos = np.arange(number_of_words)
-    objects = []
-    performance = []
-    for i in range(number_of_words):
-        aux = word_freq[i]
-        objects.append(aux[0])
-        performance.append(aux[1])
-    df_words = pd.DataFrame({'words': objects, 'count': performance})
-    fig = px.treemap(df_words, path=["words"],
+    return drawFrequencyTreeMap(frequencyTable(listText, number_of_words, stopwords, ngramRange, vocabulary, n_jobs))
+
+
+@instrumented
+def drawFrequencyTreeMap(table):
+    """
+    Draw the tree map of a frequency table with plotly express.
+
+    Parameters
+    ----------
+    table : pandas DataFrame
+        Table with the columns words and count, as returned by frequencyTable.
+
+    Returns
+    -------
+    plotly.graph_objs._figure.Figure
+    """
+    import plotly.express as px
+
+    fig = px.treemap(table, path=["words"],
                      values='count',
                      color='count',
                      color_continuous_scale='viridis',
-                     color_continuous_midpoint=np.average(df_words['count'])
+                     color_continuous_midpoint=np.average(table['count'])
                      )
     fig.update_layout(margin=dict(t=50, l=25, r=25, b=25))
     return fig
 
 
-def frequencyDonutChart(listText, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None):
+@instrumented
+def frequencyDonutChart(listText, number_of_words=20, stopwords=None, ngramRange=(1, 1), vocabulary=None, n_jobs=None):
     """
     This function takes a text as input and plots a donut chart with the word frequencies using Plotly.
 
@@ -267,23 +425,36 @@ def frequencyDonutChart(listText, number_of_words=20, stopwords=None, ngramRange
         in the mapping should not be repeated and should not have any gap
         between 0 and the largest index.
 
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
     Returns
     -------
         plotly.graph_objs._figure.Figure
     """
-    count_vect = __countvectorize(listText, stopwords, ngramRange, vocabulary)
-    count_vect.fit(listText)
-    bag_of_words = count_vect.transform(listText)
-    sum_words = bag_of_words.sum(axis=0)
-    word_freq = [(word, sum_words[0, idx])
-                 for word, idx in count_vect.vocabulary_.items()]
-    word_freq = sorted(word_freq, key=lambda x: x[1], reverse=True)
-    top_words = {k: v for k, v in word_freq[:number_of_words]}
+    return drawFrequencyDonutChart(frequencyTable(listText, number_of_words, stopwords, ngramRange, vocabulary, n_jobs))
+
+
+@instrumented
+def drawFrequencyDonutChart(table):
+    """
+    Draw the donut chart of a frequency table with plotly.
+
+    Parameters
+    ----------
+    table : pandas DataFrame
+        Table with the columns words and count, as returned by frequencyTable.
+
+    Returns
+    -------
+    plotly.graph_objs._figure.Figure
+    """
+    import plotly.graph_objects as go
 
     # Create the trace for the donut chart
     trace = go.Pie(
-        labels=list(top_words.keys()),
-        values=list(top_words.values()),
+        labels=table['words'].tolist(),
+        values=table['count'].tolist(),
         hole=0.4,
         hoverinfo='label+percent',
         marker=dict(colors=['#66c2a5', '#fc8d62', '#8da0cb', '#e78ac3',
@@ -299,3 +470,31 @@ def frequencyDonutChart(listText, number_of_words=20, stopwords=None, ngramRange
     # Create the figure and plot the donut chart
     fig = go.Figure(data=[trace], layout=layout)
     return fig
+
+
+@instrumented
+def drawFrequencyByLabel(table, facet_col_wrap=4):
+    """
+    Draw one bar graph per label of a table returned by Corpus.frequencyByLabel.
+
+    Parameters
+    ----------
+    table : pandas DataFrame
+        Table with the columns label, words and count.
+
+    facet_col_wrap : int
+        Maximum number of bar graphs in a row.
+
+    Returns
+    -------
+    plotly.graph_objs._figure.Figure
+    """
+    import plotly.express as px
+
+    fig = px.bar(table, x='count', y='words', facet_col='label',
+                 facet_col_wrap=facet_col_wrap, orientation='h',
+                 title='Frequency of tokens by label')
+    fig.update_yaxes(matches=None, showticklabels=True,
+                     autorange='reversed', title=None)
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split('=')[-1]))
+    return fig
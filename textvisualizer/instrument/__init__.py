@@ -0,0 +1,4 @@
+"""
+Module for timing the stages of the visualizations
+"""
+from .instrument import addHandler, removeHandler, recordStages, stage, instrumented
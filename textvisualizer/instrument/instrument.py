@@ -0,0 +1,198 @@
+"""
+Module for timing the stages of the visualizations
+"""
+
+import functools
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# callbacks that receive the record of every stage; nothing is measured while it is empty
+_handlers = []
+# stack of the open stages of each thread
+_local = threading.local()
+# the traced memory peak is shared by the process, so memory is only measured while a
+# single thread runs stages: count the threads with open stages and the times one started
+_threadsLock = threading.Lock()
+_activeThreads = 0
+_threadStarts = 0
+
+
+def addHandler(handler):
+    """
+    Register a callback called at the end of every stage.
+
+    The callback receives a dict with the keys:
+
+    - stage: name of the stage, e.g. 'Corpus.frequencyTreeMap' or 'drawFrequencyTreeMap'.
+    - parent: name of the enclosing stage, or None.
+    - wall: elapsed time in seconds.
+    - cpu: CPU time of the process in seconds.
+    - memory: peak of the memory traced by tracemalloc during the stage, in bytes above the
+      memory traced at its start. None if tracemalloc is not tracing (see tracemalloc.start),
+      on Python before 3.9, which can not reset the peak, or when stages ran in another thread
+      during the stage, since the peak is shared by the whole process.
+    - error: name of the exception raised by the stage, or None.
+
+    Parameters
+    ----------
+    handler : callable
+        Function of one argument, the record of a stage.
+    """
+    _handlers.append(handler)
+
+
+def removeHandler(handler):
+    """
+    Unregister a callback registered with addHandler.
+
+    Parameters
+    ----------
+    handler : callable
+    """
+    if handler in _handlers:
+        _handlers.remove(handler)
+
+
+@contextmanager
+def recordStages():
+    """
+    Collect the records of the stages run inside a with block.
+
+    Examples
+    --------
+    >>> with recordStages() as records:
+    ...     corpus.frequencyTreeMap()
+    >>> [(record['stage'], record['wall']) for record in records]
+
+    Yields
+    ------
+    list of dict
+        The records, in the order the stages end.
+    """
+    records = []
+    addHandler(records.append)
+    try:
+        yield records
+    finally:
+        removeHandler(records.append)
+
+
+class _NullStage:
+    """
+    Stage used when no handler is registered. It measures nothing.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """
+    Stage measured for the registered handlers.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        global _activeThreads, _threadStarts
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        with _threadsLock:
+            if not stack:
+                _activeThreads += 1
+                _threadStarts += 1
+            alone = _activeThreads == 1
+            self.starts = _threadStarts
+        self.parent = stack[-1] if stack else None
+        self.tracing = alone and tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak')
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None and self.parent.tracing:
+                # the peak is reset below, so keep the peak reached by the parent until now
+                self.parent.peak = max(self.parent.peak, peak)
+            tracemalloc.reset_peak()
+            self.start_memory = self.peak = current
+        stack.append(self)
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        global _activeThreads
+        memory = None
+        # no other thread started stages since this one started
+        if self.tracing and tracemalloc.is_tracing() and self.starts == _threadStarts:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            memory = self.peak - self.start_memory
+            if self.parent is not None and self.parent.tracing:
+                self.parent.peak = max(self.parent.peak, self.peak)
+        _local.stack.pop()
+        if not _local.stack:
+            with _threadsLock:
+                _activeThreads -= 1
+        record = {'stage': self.name,
+                  'parent': None if self.parent is None else self.parent.name,
+                  'wall': wall,
+                  'cpu': cpu,
+                  'memory': memory,
+                  'error': None if exc_type is None else exc_type.__name__}
+        for handler in list(_handlers):
+            handler(record)
+        return False
+
+
+def stage(name):
+    """
+    Measure the code of a with block as a stage.
+
+    When no handler is registered, a shared object that measures nothing is returned,
+    so an instrumented stage costs a single list check.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage.
+
+    Returns
+    -------
+    context manager
+    """
+    if not _handlers:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def instrumented(function):
+    """
+    Decorator that measures each call of a function as a stage named after the function.
+
+    Parameters
+    ----------
+    function : callable
+
+    Returns
+    -------
+    callable
+    """
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _handlers:
+            return function(*args, **kwargs)
+        with _Stage(name):
+            return function(*args, **kwargs)
+
+    return wrapper
@@ -1,16 +1,18 @@
 """
 Module to make a lexical dispersion plot.
 """
+import numpy as np
+from ..counting.counting import tokenize
+from ..textvisualizer import _newFigure
+from ..instrument.instrument import instrumented
 
-from yellowbrick.text import DispersionPlot
 
-
-def lexicalDispersionPlot(listText, targetWords):
+@instrumented
+def lexicalDispersionPlot(listText, targetWords, bins=None):
     """
     Make a lexical dispersion plot.
 
     It receives a list of text and a list of words and make a lexical dispersion plot.
-    It uses the package yellowbrick under the hood.
 
     Parameters
     ----------
@@ -20,11 +22,102 @@ def lexicalDispersionPlot(listText, targetWords):
     targetWords : list of strings
         The list of words to be used to plot the figure.
 
+    bins : int, default=None
+        Number of bins of the word offsets. If None, one marker is drawn per occurrence,
+        otherwise the number of occurrences of each bin is drawn as a heat map.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
     """
-    # Create a list of words from the corpus text
-    text = [doc.split() for doc in listText]
+    offsets, total_words = dispersionOffsets(listText, targetWords)
+    return drawLexicalDispersion(offsets, total_words, bins)
+
+
+@instrumented
+def dispersionOffsets(listText, targetWords):
+    """
+    Find the offsets of the occurrences of some words in a list of texts.
+
+    The offset of a token is its position in the texts read one after the other.
+    The texts are tokenized by the rule of the document-term matrix, so the words are
+    matched in lowercase.
+
+    Parameters
+    ----------
+    listText : list of strings
+        The corpus of text.
+
+    targetWords : list of strings
+        The words to be found.
+
+    Returns
+    -------
+    tuple (dict, int)
+        The sorted numpy array of int64 offsets of each target word and the total number of tokens.
+    """
+    found = {word.lower(): [] for word in targetWords}
+    total_words = 0
+    for text in listText:
+        tokens = tokenize(text)
+        for i, token in enumerate(tokens):
+            if token in found:
+                found[token].append(total_words + i)
+        total_words += len(tokens)
+    offsets = {word: np.array(found[word.lower()], dtype=np.int64) for word in targetWords}
+    return offsets, total_words
+
+
+@instrumented
+def drawLexicalDispersion(offsets, total_words=None, bins=None):
+    """
+    Draw the lexical dispersion plot of the offsets of some words.
+
+    Parameters
+    ----------
+    offsets : dict
+        The numpy array of offsets of each word, as returned by dispersionOffsets.
+        The first word is drawn at the top.
+
+    total_words : int, default=None
+        Total number of tokens of the texts, the end of the x axis.
+        If None, the largest offset is used.
+
+    bins : int, default=None
+        Number of bins of the word offsets. If None, one marker is drawn per occurrence,
+        otherwise the number of occurrences of each bin is drawn as a heat map, whose cost
+        does not depend on the number of occurrences.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+    """
+    from yellowbrick.style import resolve_colors
+
+    words = list(offsets)
+    if not any(len(positions) for positions in offsets.values()):
+        raise BaseException("No search terms were found in the corpus")
+    if total_words is None:
+        total_words = max(int(positions.max()) + 1 for positions in offsets.values() if len(positions))
+
+    fig, ax = _newFigure()
+    if bins is None:
+        color = resolve_colors(n_colors=1)[0]
+        for i, word in enumerate(words):
+            positions = offsets[word]
+            ax.scatter(positions, np.full(len(positions), len(words) - 1 - i),
+                       marker="|", c=[color], zorder=100)
+        ax.set_ylim(-1, len(words))
+    else:
+        edges = np.linspace(0, max(total_words, 1), bins + 1)
+        density = np.stack([np.histogram(offsets[word], bins=edges)[0] for word in words[::-1]])
+        image = ax.imshow(density, aspect='auto', origin='lower', interpolation='nearest', cmap='Blues',
+                          extent=(0, edges[-1], -0.5, len(words) - 0.5))
+        fig.colorbar(image, ax=ax, label="Occurrences per bin")
 
-    # Create the visualizer and draw the plot
-    visualizer = DispersionPlot(targetWords)
-    visualizer.fit(text)
-    visualizer.show()
+    ax.set_yticks(list(range(len(words))))
+    ax.set_yticklabels(words[::-1])
+    ax.set_title("Lexical Dispersion Plot")
+    ax.set_xlabel("Word Offset")
+    ax.grid(False)
+    return fig
@@ -2,15 +2,361 @@
 Module for phraseNet plot
 """
 
-import re
+import heapq
 import numpy as np
-import plotly.graph_objects as go
-import networkx as nx
-import matplotlib.pyplot as plt
-from sklearn.feature_extraction.text import CountVectorizer
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from ..counting.counting import tokenize, TokenStore, _effectiveJobs, _split
+from ..textvisualizer import _newFigure, _graphLayout
+from ..instrument.instrument import instrumented
+from ..cache.cache import textsFingerprint, _cachedStatistics
 
 
-def phraseNet(listText, connectors, number_of_pairs=20):
+def _connectorSequences(connectors):
+    """
+    Map the first token of each connector to the token sequences of the connectors.
+
+    A connector of several words, like "of the", is a sequence of several tokens.
+    """
+    sequences = {}
+    for connector in connectors:
+        tokens = tuple(tokenize(connector))
+        if tokens and tokens not in sequences.get(tokens[0], []):
+            sequences.setdefault(tokens[0], []).append(tokens)
+    return sequences
+
+
+def _countPhrases(listText, sequences):
+    """
+    Count the (left word, connector, right word) triples of a list of texts.
+
+    Only the positions whose token starts a connector are visited, so the memory
+    grows with the number of connector hits instead of the number of distinct trigrams.
+    """
+    counts = Counter()
+    for text in listText:
+        tokens = tokenize(text)
+        n = len(tokens)
+        for i in [i for i in range(1, n - 1) if tokens[i] in sequences]:
+            for sequence in sequences[tokens[i]]:
+                end = i + len(sequence)
+                if end < n and (len(sequence) == 1 or tuple(tokens[i:end]) == sequence):
+                    counts[(tokens[i - 1], ' '.join(sequence), tokens[end])] += 1
+    return counts
+
+
+def _countPhrasesShard(args):
+    return _countPhrases(*args)
+
+
+@instrumented
+def _phraseCounts(listText, connectors, n_jobs=None):
+    """
+    Count the phrases of the given connectors, in n_jobs processes if requested.
+    """
+    sequences = _connectorSequences(connectors)
+    n_jobs = _effectiveJobs(n_jobs)
+    if n_jobs == 1:
+        return _countPhrases(listText, sequences)
+
+    shards = [(shard, sequences) for shard in _split(listText, n_jobs)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        partials = list(executor.map(_countPhrasesShard, shards))
+    counts = Counter()
+    for partial in partials:
+        counts.update(partial)
+    return counts
+
+
+@instrumented
+def _phraseGraph(phrase_counts, number_of_pairs):
+    """
+    Build the graph of the most frequent phrases.
+    """
+    import networkx as nx
+
+    # ties are broken by the phrase itself, so the result does not depend on n_jobs
+    most_common = heapq.nsmallest(number_of_pairs, phrase_counts.items(),
+                                  key=lambda x: (-x[1], x[0]))
+
+    G = nx.DiGraph()
+    for (left, connector, right), count in most_common:
+        # Create connections between nodes
+        G.add_edge(left, right, weight=1)
+    return G
+
+
+def _encodeGraph(G):
+    # the nodes are kept in their order, which sets the layout
+    return {'nodes': np.array(list(G.nodes()), dtype=str),
+            'sources': np.array([source for source, target in G.edges()], dtype=str),
+            'targets': np.array([target for source, target in G.edges()], dtype=str)}
+
+
+def _decodeGraph(arrays):
+    import networkx as nx
+
+    G = nx.DiGraph()
+    G.add_nodes_from(arrays['nodes'].tolist())
+    G.add_edges_from(zip(arrays['sources'].tolist(), arrays['targets'].tolist()), weight=1)
+    return G
+
+
+class PhraseIndex:
+    """
+    Class PhraseIndex to answer phrase net queries without reading the texts again.
+
+    The texts are tokenized once and the positions of the tokens are grouped by token,
+    so the phrases of any connector are read from the positions of its first token
+    and the offsets of any word are found in time proportional to its occurrences.
+    The index reads the arrays of a TokenStore, it does not copy them.
+    Attributes
+    ----------
+        terms : numpy array of str
+            The vocabulary, sorted alphabetically.
+        tokens : numpy array of uint32
+            Ids of the tokens of all texts, one text after the other.
+        textBounds : numpy array of int64
+            Position in tokens of the first token of each text, followed by the number of tokens.
+    """
+
+    @instrumented
+    def __init__(self, listText, n_jobs=None):
+        """
+        Constructor of the class PhraseIndex
+        Parameters
+        ----------
+        listText : list of str
+            The texts to be indexed.
+        n_jobs : int, default=None
+            Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+        """
+        self.__index(TokenStore(listText, n_jobs))
+
+    @classmethod
+    @instrumented
+    def fromTokens(cls, tokens):
+        """
+        Build the index of texts already tokenized, without reading them again.
+
+        Parameters
+        ----------
+        tokens : TokenStore
+            The tokens of the texts.
+
+        Returns
+        -------
+        PhraseIndex
+        """
+        index = cls.__new__(cls)
+        index.__index(tokens)
+        return index
+
+    def __index(self, tokens):
+        """
+        Private method to group the positions of the tokens of a TokenStore by token.
+        """
+        self.terms = tokens.terms
+        self.tokens = tokens.ids
+        self.textBounds = tokens.offsets
+        order = np.argsort(self.tokens, kind='stable')
+        self.__positions = order.astype(np.uint32) if len(order) < 2 ** 32 else order
+        self.__bounds = np.concatenate(
+            [[0], np.cumsum(np.bincount(self.tokens, minlength=len(self.terms)))])
+
+    def __occurrences(self, index):
+        """
+        Private method to get the positions of a token id, with the text and the bounds of the text of each one.
+        """
+        positions = self.__positions[self.__bounds[index]:self.__bounds[index + 1]].astype(np.int64)
+        texts = np.searchsorted(self.textBounds, positions, side='right') - 1
+        return positions, texts, self.textBounds[texts], self.textBounds[texts + 1]
+
+    def __repr__(self):
+        return "{self.__class__.__name__}()".format(self=self)
+
+    def __str__(self):
+        return "Object of class {self.__class__.__name__}".format(self=self)
+
+    @instrumented
+    def phraseCounts(self, connectors, rows=None):
+        """
+        Count the (left word, connector, right word) phrases of the given connectors.
+
+        Parameters
+        ----------
+        connectors : list of strings
+            List of connectors. A connector can have several words, like "of the".
+
+        rows : array-like of int, default=None
+            Positions of the texts to be counted. If None, all texts are counted.
+
+        Returns
+        -------
+        collections.Counter
+            The count of each (left word, connector, right word) tuple.
+        """
+        counts = Counter()
+        size = len(self.terms)
+        if rows is not None:
+            selected = np.zeros(len(self.textBounds) - 1, dtype=bool)
+            selected[np.asarray(rows, dtype=np.intp)] = True
+        for sequences in _connectorSequences(connectors).values():
+            for sequence in sequences:
+                words = np.array(sequence, dtype=object)
+                ids = np.searchsorted(self.terms, words)
+                if np.any(ids >= size) or np.any(self.terms[ids] != words):
+                    continue
+                positions, texts, starts, ends = self.__occurrences(ids[0])
+                # a word on each side of the connector, in the same text
+                keep = (positions > starts) & (positions + len(ids) < ends)
+                if rows is not None:
+                    keep &= selected[texts]
+                positions = positions[keep]
+                for j in range(1, len(ids)):
+                    positions = positions[self.tokens[positions + j] == ids[j]]
+                left = self.tokens[positions - 1]
+                right = self.tokens[positions + len(ids)]
+                pairs, pair_counts = np.unique(left.astype(np.int64) * size + right,
+                                               return_counts=True)
+                connector = ' '.join(sequence)
+                for pair, count in zip(pairs, pair_counts):
+                    counts[(self.terms[pair // size], connector, self.terms[pair % size])] += int(count)
+        return counts
+
+    @instrumented
+    def offsets(self, words, rows=None):
+        """
+        Find the offsets of the occurrences of some words.
+
+        The offset of a token is its position in the texts read one after the other,
+        as in lexicalDispersion.dispersionOffsets.
+
+        Parameters
+        ----------
+        words : list of strings
+            The words to be found. They are matched in lowercase.
+
+        rows : array-like of int, default=None
+            Positions of the texts to be read. If None, all texts are read.
+
+        Returns
+        -------
+        tuple (dict, int)
+            The sorted numpy array of int64 offsets of each word and the total number of tokens.
+        """
+        lengths = np.diff(self.textBounds)
+        if rows is not None:
+            selected = np.zeros(len(lengths), dtype=bool)
+            selected[np.asarray(rows, dtype=np.intp)] = True
+            lengths = np.where(selected, lengths, 0)
+        # offset of the first token of each text
+        bases = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        result = {}
+        for word in words:
+            index = np.searchsorted(self.terms, word.lower())
+            if index >= len(self.terms) or self.terms[index] != word.lower():
+                result[word] = np.array([], dtype=np.int64)
+                continue
+            positions, texts, starts, ends = self.__occurrences(index)
+            if rows is not None:
+                keep = selected[texts]
+                positions, texts, starts = positions[keep], texts[keep], starts[keep]
+            result[word] = bases[texts] + (positions - starts)
+        return result, int(bases[-1])
+
+    @instrumented
+    def keywordNgrams(self, keyword, max_n=5):
+        """
+        Count the n-grams that start or end with a keyword, as in wordtree.wordTreeNgrams.
+
+        Only the contexts of the occurrences of the keyword are read.
+
+        Parameters
+        ----------
+        keyword : string
+            The keyword. It is matched in lowercase.
+
+        max_n : integer
+            Maximum number of tokens of an n-gram.
+
+        Returns
+        -------
+        collections.Counter
+            The count of each n-gram, a tuple of tokens.
+        """
+        keyword = keyword.lower()
+        counts = Counter()
+        index = np.searchsorted(self.terms, keyword)
+        if index >= len(self.terms) or self.terms[index] != keyword or max_n < 2:
+            return counts
+        positions, texts, starts, ends = self.__occurrences(index)
+        steps = np.arange(1, max_n)
+        # the k-th column holds the token k positions after (before) each occurrence;
+        # the columns past the bounds of the text are not read
+        right = self.tokens[np.minimum(positions[:, None] + steps, len(self.tokens) - 1)]
+        left = self.tokens[np.maximum(positions[:, None] - steps, 0)]
+        right_length = np.minimum(ends - positions - 1, max_n - 1)
+        left_length = np.minimum(positions - starts, max_n - 1)
+
+        for n in range(2, max_n + 1):
+            following = right[right_length >= n - 1, :n - 1]
+            # an n-gram with the keyword at both ends is counted from its start
+            preceding = left[left_length >= n - 1, :n - 1]
+            preceding = preceding[preceding[:, n - 2] != index, ::-1]
+            for context, before in ((following, False), (preceding, True)):
+                if len(context) == 0:
+                    continue
+                grams, gram_counts = np.unique(context, axis=0, return_counts=True)
+                for gram, count in zip(grams, gram_counts):
+                    words = tuple(self.terms[gram])
+                    counts[words + (keyword,) if before else (keyword,) + words] += int(count)
+        return counts
+
+
+@instrumented
+def phraseNetGraph(listText, connectors, number_of_pairs=20, n_jobs=None):
+    """
+    Build the Phrase net graph of a list of texts.
+
+    Each edge links the words around one of the most frequent phrases made of a word,
+    a connector and a word. A connector can have several words, like "of the".
+    It is the data drawn by phraseNet and phraseNetPlotly.
+
+    Parameters
+    ----------
+    listText : list of strings
+        List of text to be used as text source in the construction of the graph.
+
+    connectors : list of strings
+        List of connectors to be used in the construction of the graph.
+
+    number_of_pairs : int
+        Number of pairs of words to create the graph.
+
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+    Returns
+    -------
+    networkx.DiGraph
+        The graph, with the connectors in G.graph['connectors'].
+
+    Notes
+    -----
+    When the statistics cache is on, the edges are read from it if the same texts were
+    counted before with the same parameters. See configureStatisticsCache.
+    """
+    G = _cachedStatistics(
+        lambda: ('phraseNetGraph', textsFingerprint(listText), list(connectors), number_of_pairs),
+        lambda: _phraseGraph(_phraseCounts(listText, connectors, n_jobs), number_of_pairs),
+        _encodeGraph, _decodeGraph)
+    G.graph['connectors'] = list(connectors)
+    return G
+
+
+@instrumented
+def phraseNet(listText, connectors, number_of_pairs=20, n_jobs=None):
     """
     Plot the Phrase net of a list of texts.
 
@@ -28,48 +374,41 @@ def phraseNet(listText, connectors, number_of_pairs=20):
 
     number_of_pairs : int
         Number of pairs of words to create the graph.
+
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
     """
-    for i in range(len(connectors)):
-        if " " in connectors[i]:
-            conOrig = connectors[i]
-            conNew = re.sub(" ", "_", conOrig)
-            connectors[i] = conNew
-            for j in range(len(listText)):
-                listText[j] = re.sub(conOrig, conNew, listText[j])
-        connectors[i] = " %s " % connectors[i]
-
-    trigram_count_vect = CountVectorizer(analyzer='word', ngram_range=(3, 3))
-    trigram_count_vect.fit(listText)
-    bag_of_trigrams = trigram_count_vect.transform(listText)
-    sum_trigrams = bag_of_trigrams.sum(axis=0)
-    trigrams_freq = [(trigram, sum_trigrams[0, idx])
-                     for trigram, idx in trigram_count_vect.vocabulary_.items()]
-    trigrams_freq = sorted(trigrams_freq, key=lambda x: x[1], reverse=True)
-    y_pos = np.arange(number_of_pairs)
-    objects = []
-    performance = []
-    count = 0
-    i = 0
+    return drawPhraseNet(phraseNetGraph(listText, connectors, number_of_pairs, n_jobs))
 
-    G = nx.DiGraph()
-    while (count < number_of_pairs) and (i < len(trigrams_freq)):
-        aux = trigrams_freq[i]
 
-        if sum([connector in aux[0] for connector in connectors]) > 0:
-            aux = aux[0].split()
-            # Create connections between nodes
-            G.add_edge(aux[0], aux[2], weight=1)
-            count += 1
-        i += 1
+@instrumented
+def drawPhraseNet(G):
+    """
+    Draw a phrase net graph with networkx and matplotlib.
 
-    fig, ax = plt.subplots(figsize=(12, 8))
+    Parameters
+    ----------
+    G : networkx.DiGraph
+        The graph returned by phraseNetGraph.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+    """
+    import networkx as nx
+
+    fig, ax = _newFigure(figsize=(12, 8))
 
     # Hide grid lines
     ax.grid(False)
 
     #pos = nx.spring_layout(G, k=5.5)
     #pos = nx.kamada_kawai_layout(G)
-    pos = nx.circular_layout(G)
+    pos = _graphLayout(G)
 
     # Plot network
     nx.draw_networkx(G, pos,
@@ -81,10 +420,11 @@ def phraseNet(listText, connectors, number_of_pairs=20):
                      with_labels=True,
                      ax=ax)
 
-    plt.show()
+    return fig
 
 
-def phraseNetPlotly(listText, connectors, number_of_pairs=20):
+@instrumented
+def phraseNetPlotly(listText, connectors, number_of_pairs=20, n_jobs=None):
     """
     Plot the Phrase net of a list of texts using Plotly.
 
@@ -103,46 +443,36 @@ def phraseNetPlotly(listText, connectors, number_of_pairs=20):
     number_of_pairs : int
         Number of pairs of words to create the graph.
 
+    n_jobs : int, default=None
+        Number of processes used to tokenize the texts. None means 1 and -1 means all processors.
+
     Returns
     -------
     plotly.graph_objs._figure.Figure
     """
-    for i in range(len(connectors)):
-        if " " in connectors[i]:
-            conOrig = connectors[i]
-            conNew = re.sub(" ", "_", conOrig)
-            connectors[i] = conNew
-            for j in range(len(listText)):
-                listText[j] = re.sub(conOrig, conNew, listText[j])
-        connectors[i] = " %s " % connectors[i]
-
-    trigram_count_vect = CountVectorizer(analyzer='word', ngram_range=(3, 3))
-    trigram_count_vect.fit(listText)
-    bag_of_trigrams = trigram_count_vect.transform(listText)
-    sum_trigrams = bag_of_trigrams.sum(axis=0)
-    trigrams_freq = [(trigram, sum_trigrams[0, idx])
-                     for trigram, idx in trigram_count_vect.vocabulary_.items()]
-    trigrams_freq = sorted(trigrams_freq, key=lambda x: x[1], reverse=True)
-    y_pos = np.arange(number_of_pairs)
-    objects = []
-    performance = []
-    count = 0
-    i = 0
+    return drawPhraseNetPlotly(phraseNetGraph(listText, connectors, number_of_pairs, n_jobs))
 
-    G = nx.DiGraph()
-    while (count < number_of_pairs) and (i < len(trigrams_freq)):
-        aux = trigrams_freq[i]
 
-        if sum([connector in aux[0] for connector in connectors]) > 0:
-            aux = aux[0].split()
-            # Create connections between nodes
-            G.add_edge(aux[0], aux[2], weight=1)
-            count += 1
-        i += 1
+@instrumented
+def drawPhraseNetPlotly(G):
+    """
+    Draw a phrase net graph with Plotly.
+
+    Parameters
+    ----------
+    G : networkx.DiGraph
+        The graph returned by phraseNetGraph.
+
+    Returns
+    -------
+    plotly.graph_objs._figure.Figure
+    """
+    import networkx as nx
+    import plotly.graph_objects as go
 
     #pos = nx.spring_layout(G, k=5.5)
     #pos = nx.kamada_kawai_layout(G)
-    pos = nx.circular_layout(G)
+    pos = _graphLayout(G)
 
     # Create Edges
     edge_x = []
@@ -191,8 +521,8 @@ def phraseNetPlotly(listText, connectors, number_of_pairs=20):
     node_trace.text = node_text
     fig = go.Figure(data=[edge_trace, node_trace],
                     layout=go.Layout(
-        title='Phrase Net -' + ' '.join(connectors),
-        titlefont_size=16,
+        title=dict(text='Phrase Net -' + ' '.join(" %s " % c for c in G.graph.get('connectors', [])),
+                   font=dict(size=16)),
         showlegend=False,
         hovermode='closest',
         margin=dict(b=20, l=5, r=5, t=40),
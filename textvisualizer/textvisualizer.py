@@ -1,3 +1,76 @@
 """
 Module for text data visualization
 """
+from .instrument.instrument import instrumented
+
+
+def _newFigure(figsize=None, **subplot_kw):
+    """
+    Create a figure and its axes without touching the pyplot state.
+
+    The figure is not registered in pyplot, so it is never shown by plt.show()
+    and it is released as soon as it is not referenced anymore. It is drawn by
+    its own Agg canvas, so figures can be rendered from several threads at once.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots(subplot_kw=subplot_kw or None)
+    return fig, ax
+
+
+@instrumented
+def _graphLayout(G):
+    """
+    Circular layout of a graph.
+
+    It only depends on the number and the order of the nodes and is cheaper to compute
+    than to look up, so it is not kept in the layout cache.
+    """
+    import networkx as nx
+
+    return nx.circular_layout(G)
+
+
+@instrumented
+def figureBytes(figure, fmt='png'):
+    """
+    Render a figure returned by any function of the package.
+
+    Parameters
+    ----------
+    figure : matplotlib.figure.Figure, plotly.graph_objs._figure.Figure or graphviz.Digraph
+        The figure to be rendered.
+
+    fmt : str, default='png'
+        The output format, 'png' or 'svg'.
+
+    Returns
+    -------
+    bytes
+        The rendered image.
+    """
+    if fmt not in ('png', 'svg'):
+        raise BaseException("Invalid format. Please choose png or svg.")
+    if hasattr(figure, 'savefig'):
+        import io
+
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format=fmt)
+        return buffer.getvalue()
+    if hasattr(figure, 'to_image'):
+        # plotly needs the kaleido package to export static images
+        return figure.to_image(format=fmt)
+    if _isGraphviz(figure):
+        return figure.pipe(format=fmt)
+    raise TypeError("Object of type %s is not a figure." % type(figure).__name__)
+
+
+def _isGraphviz(figure):
+    try:
+        import graphviz
+    except ImportError:
+        return False
+    return isinstance(figure, (graphviz.Digraph, graphviz.Graph))
@@ -1,13 +1,14 @@
 """
 Module for wordcloud plot
 """
-
-import wordcloud
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib_venn_wordcloud import venn2_wordcloud, venn3_wordcloud
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from ..textvisualizer import _newFigure
+from ..counting.counting import tokenize, _effectiveJobs
+from ..instrument.instrument import instrumented
 
 
+@instrumented
 def wordcloudPlot(text, stopwords=None, max_font_size=50, max_words=100, background_color="white"):
     """
     Generate Word cloud figure.
@@ -28,16 +29,140 @@ def wordcloudPlot(text, stopwords=None, max_font_size=50, max_words=100, backgro
     max_words : number (default=100)
         The maximum number of words.
 
+    Returns
+    -------
+    matplotlib.figure.Figure
     """
+    import wordcloud
+
     cloud = wordcloud.WordCloud(stopwords=stopwords, max_font_size=max_font_size,
                                 max_words=max_words, background_color=background_color).generate(text.lower())
+    return _drawWordcloud(cloud)
+
+
+def _wordcloudStopwords(stopwords=None):
+    """
+    Stop words of a counted word cloud, split by tokenize like the counted texts, so they are
+    lowercase as in the wordcloud package and a contraction like "don't" also removes its
+    fragment "don". If stopwords is None, the stop words of the wordcloud package are used.
+    """
+    if stopwords is None:
+        from wordcloud import STOPWORDS
+
+        stopwords = STOPWORDS
+    return sorted({token for word in stopwords for token in tokenize(word)})
+
+
+def _mergePlurals(counts, terms, indices=None):
+    """
+    Add the count of each plural to the count of its singular, as the wordcloud package does.
+
+    A term ending with "s", but not with "ss", is a plural when the term without the "s"
+    is also counted. Numbers are dropped first, as the wordcloud package does by default.
+    terms must be sorted. Returns the merged counts and their positions in terms.
+    """
+    counts = np.asarray(counts).ravel()
+    if indices is None:
+        indices = np.flatnonzero(counts)
+        counts = counts[indices]
+    else:
+        indices = np.asarray(indices).ravel()
+        keep = counts > 0
+        indices, counts = indices[keep], counts[keep]
+    keep = np.array([not term.isdigit() for term in terms[indices]], dtype=bool)
+    indices, counts = indices[keep], counts[keep]
+    counted = np.zeros(len(terms), dtype=bool)
+    counted[indices] = True
+    words = terms[indices]
+    plurals = np.flatnonzero([word.endswith('s') and not word.endswith('ss') for word in words])
+    targets = indices.copy()
+    if len(plurals):
+        singulars = np.array([word[:-1] for word in words[plurals]], dtype=object)
+        positions = np.minimum(np.searchsorted(terms, singulars), len(terms) - 1)
+        found = (terms[positions] == singulars) & counted[positions]
+        targets[plurals[found]] = positions[found]
+    merged, inverse = np.unique(targets, return_inverse=True)
+    totals = np.zeros(len(merged), dtype=np.int64)
+    np.add.at(totals, inverse, counts)
+    return totals, merged
+
+
+def _drawWordcloudFromFrequencies(frequencies, max_font_size=50, max_words=100, background_color="white"):
+    return _drawWordcloud(_wordcloudFromFrequencies(frequencies, max_font_size, max_words, background_color))
+
+
+@instrumented
+def _wordcloudFromFrequencies(frequencies, max_font_size=50, max_words=100, background_color="white"):
+    import wordcloud
+
+    return wordcloud.WordCloud(max_font_size=max_font_size, max_words=max_words,
+                               background_color=background_color).generate_from_frequencies(frequencies)
+
+
+@instrumented
+def wordcloudImages(listFrequencies, max_font_size=50, max_words=100, background_color="white", paths=None, n_jobs=None):
+    """
+    Generate one word cloud image per dict of term frequencies.
+
+    The words are not tokenized again, the clouds are laid out from the given counts.
+    No matplotlib figure is created.
+
+    Parameters
+    ----------
+    listFrequencies : list of dict
+        Count of each term, one dict per word cloud.
+
+    max_font_size : int or None (default=50)
+        Maximum font size for the largest word. If None, height of the image is used.
+
+    max_words : number (default=100)
+        The maximum number of words.
+
+    paths : list of str, default=None
+        Path of the png file of each word cloud. If None, the images are returned as arrays.
+
+    n_jobs : int, default=None
+        Number of processes generating word clouds at the same time. None means 1 and -1 means all processors.
+
+    Returns
+    -------
+    list of numpy arrays of shape (height, width, 3), in the order of listFrequencies.
+    if paths is given, list of str with the paths of the written files.
+    """
+    if paths is None:
+        paths = [None] * len(listFrequencies)
+    elif len(paths) != len(listFrequencies):
+        raise BaseException("Mismatch in lengths of paths and listFrequencies")
+    tasks = [(frequencies, max_font_size, max_words, background_color, path)
+             for frequencies, path in zip(listFrequencies, paths)]
+
+    n_jobs = _effectiveJobs(n_jobs)
+    if n_jobs == 1 or len(tasks) < 2:
+        return [_wordcloudImage(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as executor:
+        return list(executor.map(_wordcloudImage, tasks))
+
+
+def _wordcloudImage(args):
+    frequencies, max_font_size, max_words, background_color, path = args
+    cloud = _wordcloudFromFrequencies(frequencies, max_font_size, max_words, background_color)
+    if path is None:
+        return cloud.to_array()
+    cloud.to_file(path)
+    return path
+
+
+@instrumented
+def _drawWordcloud(cloud):
+    fig, ax = _newFigure()
 
     # Display the generated image:
-    plt.imshow(cloud, interpolation='bilinear')
-    plt.axis("off")
-    plt.show()
+    ax.imshow(cloud, interpolation='bilinear')
+    ax.axis("off")
+    return fig
 
 
+@instrumented
 def vennWordcloudPlot(listText, listLabels, labels, stopwords=None):
     """
     Generate Venn Word cloud figure.
@@ -54,37 +179,139 @@ def vennWordcloudPlot(listText, listLabels, labels, stopwords=None):
     
     labels : list of string
         Labels to be used in the venn groups. The list has to have 2 or 3 elements.
+        Only the first 3 labels are drawn.
 
     stopwords : list of strings, default=None
         That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
     """
-    df = pd.DataFrame({"text" : listText, "label" : listLabels} )
     if len(labels) < 2:
         raise BaseException('Insuficient Numbers of labels. You need to give 2 or 3 labels.')
-    elif len(labels) == 2 or len(labels) == 3:
-        df = df[df.label.isin(labels)]
-    else:
-        df = df[df.label.isin(labels[:3])]
-    str1 =  ' '.join(df[df['label']==labels[0]].text.tolist())
-    str2 =  ' '.join(df[df['label']==labels[1]].text.tolist())
-    listText2 = [str1, str2]
-    if len(labels) == 3:
-        str3 =  ' '.join(df[df['label']==labels[2]].text.tolist())
-        listText2.append(str3)
-
-    sets = [] 
-    for string in listText2:
-        # get a word list
-        words = string.split(' ')
-        # remove non alphanumeric characters
-        words = [''.join(ch for ch in word if ch.isalnum()) for word in words]
-        # convert to all lower case
-        words = [word.lower() for word in words]
-        sets.append(set(words))
-    
+    labels = list(labels[:3])
+    terms, membership = vennMembership(listText, listLabels, labels, stopwords)
+    return drawVennWordcloud(terms, membership, labels, stopwords)
+
+
+@instrumented
+def vennMembership(listText, listLabels, labels, stopwords=None):
+    """
+    Find which groups of texts use each word.
+
+    The texts are tokenized once and every word is encoded as an integer id, so the
+    vocabulary of each group is a boolean column instead of a set of strings.
+    Any number of groups is supported.
+
+    Parameters
+    ----------
+    listText : list of string
+        List of text to be used as text source.
+
+    listLabels : list of string with the labels of the text.
+        List of the labels of each element of listText.
+
+    labels : list of string
+        Labels of the groups.
+
+    stopwords : list of strings, default=None
+        That list is assumed to contain stop words, all of which will be removed from the resulting tokens.
+
+    Returns
+    -------
+    tuple (numpy array of strings, numpy array of bool)
+        The words used by at least one group, sorted alphabetically, and the matrix of shape
+        (number of words, number of labels) telling whether each group uses each word.
+    """
+    stopwords = frozenset(stopwords or ())
+    groups = {label: j for j, label in enumerate(labels)}
+    vocabulary = {}
+    ids = []
+    columns = []
+    for text, label in zip(listText, listLabels):
+        j = groups.get(label)
+        if j is None:
+            continue
+        tokens = set(tokenize(text)) - stopwords
+        ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+        columns.extend([j] * len(tokens))
+    membership = np.zeros((len(vocabulary), len(labels)), dtype=bool)
+    membership[np.array(ids, dtype=np.intp), np.array(columns, dtype=np.intp)] = True
+    terms = np.array(list(vocabulary), dtype=object)
+    order = np.argsort(terms, kind='stable')
+    return terms[order], membership[order]
+
+
+@instrumented
+def vennRegions(terms, membership, labels):
+    """
+    Split the words in the regions of a Venn diagram.
+
+    Each word belongs to exactly one region, the exact combination of groups that use it.
+    The combination is encoded as a bitmask, one bit per group, so the regions are
+    found with a single sort whatever the number of groups.
+
+    Parameters
+    ----------
+    terms : numpy array of strings
+        The words, as returned by vennMembership.
+
+    membership : numpy array of bool
+        Matrix of shape (number of words, number of labels), as returned by vennMembership.
+
+    labels : list of string
+        Labels of the columns of membership. At most 63 labels.
+
+    Returns
+    -------
+    dict with the tuple of labels of each region as key and the numpy array of its words as value.
+    Empty regions are left out.
+    """
+    if len(labels) > 63:
+        raise BaseException("Too many labels. At most 63 groups are supported.")
+    codes = membership.astype(np.int64) @ (np.int64(1) << np.arange(len(labels), dtype=np.int64))
+    order = np.argsort(codes, kind='stable')
+    codes, bounds = np.unique(codes[order], return_index=True)
+    regions = {}
+    for code, words in zip(codes, np.split(terms[order], bounds[1:])):
+        if code:
+            regions[tuple(label for j, label in enumerate(labels) if code >> j & 1)] = words
+    return regions
+
+
+@instrumented
+def drawVennWordcloud(terms, membership, labels, stopwords=None):
+    """
+    Draw the Venn Word cloud of 2 or 3 groups.
+
+    Parameters
+    ----------
+    terms : numpy array of strings
+        The words, as returned by vennMembership.
+
+    membership : numpy array of bool
+        Matrix of shape (number of words, 2 or 3), as returned by vennMembership.
+
+    labels : list of string
+        Labels of the columns of membership.
+
+    stopwords : list of strings, default=None
+        Words that are not drawn.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+    """
+    from matplotlib_venn_wordcloud import venn2_wordcloud, venn3_wordcloud
+
+    if len(labels) not in (2, 3):
+        raise BaseException('Invalid number of labels. You need to give 2 or 3 labels.')
+    sets = [set(terms[membership[:, j]]) for j in range(len(labels))]
+
     wordcloudArgs = {'max_font_size':100,'max_words' : 200, 'stopwords' : stopwords}
     
-    fig, ax = plt.subplots(1,1,figsize=(30, 30))
+    fig, ax = _newFigure(figsize=(30, 30))
 
     if len(labels) == 2:
         venn2_wordcloud(sets,
@@ -92,10 +319,10 @@ def vennWordcloudPlot(listText, listLabels, labels, stopwords=None):
                         ax=ax,
                         wordcloud_kwargs=wordcloudArgs
                         )
-    elif len(labels) == 3:
+    else:
         venn3_wordcloud(sets,
                         set_labels = labels,
                         ax=ax,
                         wordcloud_kwargs=wordcloudArgs
                         )
-    fig.show()
+    return fig
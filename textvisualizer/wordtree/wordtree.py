@@ -1,10 +1,12 @@
 """
 Module for generating word tree diagrams.
 """
-
-import wordtree
+from collections import Counter
+from ..counting.counting import tokenize
+from ..instrument.instrument import instrumented
 
 
+@instrumented
 def wordTree(corpus, keyword, maxNr=5):
     """
     Generate a word tree diagram.
@@ -26,4 +28,67 @@ def wordTree(corpus, keyword, maxNr=5):
     -------
     graphviz.graphs.Digraph
     """
-    return wordtree.search_and_draw(corpus=corpus, keyword=keyword, max_n=maxNr)
+    return drawWordTree(keyword, wordTreeNgrams(corpus, keyword, maxNr))
+
+
+@instrumented
+def wordTreeNgrams(corpus, keyword, maxNr=5):
+    """
+    Count the n-grams that start or end with a keyword.
+
+    These are the branches of the word tree: n-grams of 2 to maxNr tokens, inside a single text,
+    whose first or last token is the keyword. The texts are tokenized by the rule of the
+    document-term matrix, so the keyword is matched in lowercase.
+
+    Parameters
+    ----------
+    corpus : list of strings
+        The corpus of text.
+
+    keyword : string
+        The word to be the source of the tree.
+
+    maxNr : integer
+        Maximum number of tokens of an n-gram.
+
+    Returns
+    -------
+    collections.Counter
+        The count of each n-gram, a tuple of tokens.
+    """
+    keyword = keyword.lower()
+    counts = Counter()
+    for text in corpus:
+        tokens = tokenize(text)
+        for i in [i for i, token in enumerate(tokens) if token == keyword]:
+            for n in range(2, maxNr + 1):
+                if i + n <= len(tokens):
+                    counts[tuple(tokens[i:i + n])] += 1
+                # an n-gram with the keyword at both ends is counted from its start
+                if i - n + 1 >= 0 and tokens[i - n + 1] != keyword:
+                    counts[tuple(tokens[i - n + 1:i + 1])] += 1
+    return counts
+
+
+@instrumented
+def drawWordTree(keyword, ngramCounts):
+    """
+    Draw the word tree of the n-grams of a keyword.
+
+    Parameters
+    ----------
+    keyword : string
+        The word to be the source of the tree.
+
+    ngramCounts : Mapping
+        The count of each n-gram, as returned by wordTreeNgrams.
+
+    Returns
+    -------
+    graphviz.graphs.Digraph
+    """
+    import wordtree
+
+    if len(ngramCounts) == 0:
+        raise BaseException("The keyword %s is not in the corpus." % keyword)
+    return wordtree.draw(keyword.lower(), list(ngramCounts.keys()), list(ngramCounts.values()))